@@ -1,6 +1,7 @@
 import statistics
 from collections import defaultdict
 import pandas as pd
+from price_series import ChangePointSeries
 
 
 def run_irp_simulation_with_intervention(
@@ -25,21 +26,19 @@ def run_irp_simulation_with_intervention(
         else:
             raise ValueError(f"Unknown rule: {rule}")
 
+    # Priced countries store their prices as change points, which carry
+    # forward on their own. A country with a policy but no initial price
+    # only holds the years an IRP price is enforced in, as before.
     price_time_series = defaultdict(lambda: defaultdict(dict))
     irp_events = defaultdict(lambda: defaultdict(dict))
     YEARS = range(0, years + 1)
 
     for drug, countries in initial_prices.items():
         for country, price in countries.items():
-            price_time_series[drug][country][0] = price
+            price_time_series[drug][country] = ChangePointSeries(price)
 
     for year in YEARS[1:]:
         for drug in initial_prices:
-            for country in initial_prices[drug]:
-                prev_price = price_time_series[drug][country].get(year - 1)
-                if prev_price is not None:
-                    price_time_series[drug][country][year] = prev_price
-
             for country, policy in irp_policies.items():
                 freq = policy.get("frequency", 1)
                 delay = policy.get("enforcement_delay", 0)
@@ -1,35 +1,84 @@
 
+import os
 import streamlit as st
 import pandas as pd
 from irp_policies import irp_policies
-from dummy_data import dummy_prices, dummy_volumes
+from country_registry import CountryRegistry
+from irp_data import dataset_prices, dataset_volumes, open_dataset
+from irp_events import EventLog, with_rationale
+from irp_schedule import build_month_map
+from irp_output import align_results, comparison_cube, comparison_frame, month_dates
+from portfolio import run_portfolio
+from result_cache import ResultCache, input_key
+from run_stats import SimulationStats
 from simulator import run_irp_simulation_with_interventions
 
+SIMULATION_ENGINE = "numpy"  # "dict" runs the original month-by-month engine
+HORIZON = {"years": 10, "start_year": 2025, "start_month": 1}
+# Rule defaults for uploaded countries that irp_policies does not cover
+NO_IRP_POLICY = {"basket": [], "rule": "average", "frequency": 12, "enforcement_delay": 0, "allow_increase": False, "performs_irp": False}
+
+
+@st.cache_resource
+def result_cache():
+    # One cache per server process, shared by every session. Set
+    # IRP_RESULT_CACHE_DIR to keep results on disk across restarts.
+    return ResultCache(directory=os.environ.get("IRP_RESULT_CACHE_DIR"))
+
+
 st.set_page_config(page_title="HERCULES IRP Simulator", layout="wide")
 st.title("HERCULES IRP Simulator")
 
-all_countries = list(dummy_prices.keys())
-drug_name = st.text_input("Drug Name", "Aspirin")
+# A dataset uploaded on the home page, or saved with irp_data.save_dataset
+# and named by IRP_DATASET, replaces the dummy data; its first drug is
+# simulated, or all its drugs in portfolio mode.
+dataset = st.session_state.get("dataset")
+if dataset is None and os.environ.get("IRP_DATASET"):
+    dataset = open_dataset(os.environ["IRP_DATASET"])
+horizon = HORIZON
+if dataset is not None:
+    # A dataset's volume axis starts in January of its start year, so the
+    # simulation does too
+    horizon = dict(HORIZON, start_year=dataset.start_year)
+    default_drug = dataset.drugs[0]
+    default_prices = dataset_prices(dataset)[default_drug]
+    default_volumes = dataset_volumes(dataset)[default_drug]
+    default_policies = dict(irp_policies, **(dataset.policies or {}))
+else:
+    # Only imported without a dataset: the dummy tables are large
+    from dummy_data import dummy_prices, dummy_volumes
+    default_drug, default_prices, default_volumes, default_policies = "Aspirin", dummy_prices, dummy_volumes, irp_policies
+
+horizon_months = build_month_map(horizon["years"], horizon["start_year"])
+
+all_countries = list(default_prices.keys())
+registry = CountryRegistry(all_countries)
+_, unresolved_baskets = registry.resolve_policies({c: p for c, p in default_policies.items() if c in registry})
+if unresolved_baskets:
+    st.warning("Unknown basket countries ignored: " + ", ".join(sorted({c for names in unresolved_baskets.values() for c in names})))
+mode = st.radio("Mode", ["Single drug", "Portfolio"], horizontal=True)
+drug_name = st.text_input("Drug Name", default_drug) if mode == "Single drug" else default_drug
 
 # Step 1.1: View & Edit IRP Rules (All countries shown horizontally under one expander)
 irp_inputs = {}
 with st.expander("📘 View & Edit IRP Rules (All Countries)", expanded=False):
     st.caption("Adjust basket, rule, frequency, delay, and price increase settings below.")
     for country in all_countries:
+        policy = default_policies.get(country, NO_IRP_POLICY)
         st.markdown(f"**{country}**")
         col1, col2, col3 = st.columns([1, 1, 1])
         with col1:
-            rule = st.selectbox("Rule", ["min", "average", "median"], index=["min", "average", "median"].index(irp_policies[country]["rule"]), key=f"rule_{country}")
+            rule = st.selectbox("Rule", ["min", "average", "median"], index=["min", "average", "median"].index(policy["rule"]), key=f"rule_{country}")
         with col2:
-            freq = st.number_input("Frequency (months)", min_value=1, max_value=60, value=irp_policies[country]["frequency"], key=f"freq_{country}")
+            freq = st.number_input("Frequency (months)", min_value=1, max_value=60, value=policy["frequency"], key=f"freq_{country}")
         with col3:
-            delay = st.number_input("Delay (months)", min_value=0, max_value=24, value=irp_policies[country]["enforcement_delay"], key=f"delay_{country}")
+            delay = st.number_input("Delay (months)", min_value=0, max_value=24, value=policy["enforcement_delay"], key=f"delay_{country}")
         col4, col5 = st.columns([1, 3])
         with col4:
-            allow = st.selectbox("Allow ↑?", ["No", "Yes"], index=1 if irp_policies[country]["allow_increase"] else 0, key=f"allow_{country}")
+            allow = st.selectbox("Allow ↑?", ["No", "Yes"], index=1 if policy["allow_increase"] else 0, key=f"allow_{country}")
         with col5:
             options = [c for c in all_countries if c != country]
-        default_basket = [b for b in irp_policies[country]["basket"] if b in options]
+        default_basket = [registry.canonical(b) for b in policy["basket"] if registry.canonical(b) in options]
         basket = st.multiselect("Basket", options, default=default_basket, key=f"basket_{country}")
         irp_inputs[country] = {
             "rule": rule,
@@ -37,38 +86,129 @@ with st.expander("📘 View & Edit IRP Rules (All Countries)", expanded=False):
             "enforcement_delay": delay,
             "allow_increase": allow == "Yes",
             "basket": basket,
-            "review_month": irp_policies[country].get("review_month", 6),
-            "performs_irp": irp_policies[country].get("performs_irp", True)
+            "review_month": policy.get("review_month", 6),
+            "performs_irp": policy.get("performs_irp", True)
         }
 
+# Portfolio mode: every drug of the dataset under the rules above
+if mode == "Portfolio":
+    st.markdown("## 🗂️ Portfolio")
+    if dataset is not None:
+        portfolio_prices, portfolio_volumes = dataset_prices(dataset), dataset_volumes(dataset)
+        # The volume array stands in for the volume views in the cache key
+        volume_key = dataset.volumes
+    else:
+        portfolio_prices = {default_drug: default_prices}
+        portfolio_volumes = volume_key = {default_drug: default_volumes}
+    portfolio_policies = dict(default_policies, **irp_inputs)
+    selected_drugs = st.multiselect("Drugs", list(portfolio_prices), default=list(portfolio_prices))
+
+    if st.button("▶️ Run Portfolio Simulation") and selected_drugs:
+        portfolio_key = input_key(
+            "portfolio", SIMULATION_ENGINE, portfolio_policies, selected_drugs,
+            {drug: portfolio_prices[drug] for drug in selected_drugs}, volume_key, horizon
+        )
+        portfolio_result = result_cache().get(portfolio_key)
+        if portfolio_result is None:
+            progress = st.progress(0.0, text="Simulating portfolio…")
+
+            def on_drug(totals, done, total):
+                progress.progress(done / total, text=f"{done} of {total} drugs simulated ({totals.drug})")
+
+            portfolio = {
+                drug: {"prices": portfolio_prices[drug], "volumes": portfolio_volumes[drug]}
+                for drug in selected_drugs
+            }
+            try:
+                portfolio_result = run_portfolio(
+                    portfolio,
+                    portfolio_policies,
+                    years=horizon["years"],
+                    start_year=horizon["start_year"],
+                    engine=SIMULATION_ENGINE,
+                    on_drug=on_drug
+                )
+            except ValueError as error:
+                st.error(str(error))
+                st.stop()
+            result_cache().put(portfolio_key, portfolio_result)
+        st.session_state["portfolio_result"] = portfolio_result
+
+    if "portfolio_result" in st.session_state:
+        portfolio_result = st.session_state["portfolio_result"]
+        totals = portfolio_result.summary[["Revenue", "Revenue_No_IRP", "Exposure"]].sum()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Portfolio Revenue (€)", f"{totals['Revenue']:,.0f}")
+        col2.metric("Revenue at Launch Prices (€)", f"{totals['Revenue_No_IRP']:,.0f}")
+        exposure_pct = 100 * totals["Exposure"] / totals["Revenue_No_IRP"] if totals["Revenue_No_IRP"] else 0.0
+        col3.metric("IRP Exposure (€)", f"{totals['Exposure']:,.0f}", f"{exposure_pct:.1f}% of launch revenue", delta_color="off")
+
+        st.markdown("### 💊 Exposure by Drug")
+        st.bar_chart(portfolio_result.summary.head(25).set_index("Drug")["Exposure"])
+        st.markdown("### 🌍 Exposure by Country")
+        st.bar_chart(portfolio_result.by_country.head(25).set_index("Country")["Exposure"])
+        st.markdown("### 📈 Portfolio Revenue Over Time")
+        by_month = portfolio_result.by_month
+        st.line_chart(by_month.set_index(month_dates(by_month["Year"], by_month["Month"]))[["Revenue_No_IRP", "Revenue"]])
+
+        st.markdown("### 🧾 Drug Summary")
+        st.dataframe(portfolio_result.summary)
+        st.download_button(
+            "Download Portfolio CSV", data=portfolio_result.summary.to_csv(index=False), file_name="irp_portfolio.csv"
+        )
+    st.stop()
+
 # Step 1.2: Prices
 initial_prices = {}
 with st.expander("💶 Input & Review Prices", expanded=False):
     for country in all_countries:
-        initial_prices[country] = st.number_input(f"{country} price (€)", value=dummy_prices[country], key=f"price_{country}")
+        initial_prices[country] = st.number_input(f"{country} price (€)", value=default_prices[country], key=f"price_{country}")
 initial_prices_wrapped = {drug_name: initial_prices}
 
 # Step 1.3: Volumes
 volumes = {}
 with st.expander("📦 Input & Review Volumes", expanded=False):
     for country in all_countries:
-        vol = st.number_input(f"{country} monthly volume", value=dummy_volumes[country][0], key=f"vol_{country}")
-        volumes[country] = {m: vol for m in range(121)}
+        default_series = default_volumes[country]
+        vol = st.number_input(f"{country} monthly volume", value=default_series[0], key=f"vol_{country}")
+        # The uploaded monthly profile is kept unless the volume was edited,
+        # which then applies to every month
+        if vol == default_series[0]:
+            volumes[country] = dict(default_series)
+        else:
+            volumes[country] = {m: vol for m in range(horizon["years"] * 12 + 1)}
 volumes_wrapped = {drug_name: volumes}
 
 # Run Baseline
 if st.button("▶️ Run Baseline Simulation"):
-    baseline_df = run_irp_simulation_with_interventions(
-        initial_prices=initial_prices_wrapped,
-        volumes=volumes_wrapped,
-        irp_policies=irp_inputs,
-        interventions=[],
-        years=10,
-        start_year=2025,
-        start_month=1
-    )
+    # Set when the run happens rather than coming from the cache
+    baseline_ran = []
+
+    def run_baseline():
+        baseline_ran.append(True)
+        baseline_events = EventLog()
+        baseline_stats = SimulationStats()
+        baseline_df = run_irp_simulation_with_interventions(
+            initial_prices=initial_prices_wrapped,
+            volumes=volumes_wrapped,
+            irp_policies=irp_inputs,
+            interventions=[],
+            **horizon,
+            engine=SIMULATION_ENGINE,
+            rationale=False,
+            event_log=baseline_events,
+            stats=baseline_stats
+        )
+        return baseline_df, baseline_events, baseline_stats
+
+    baseline_key = input_key(SIMULATION_ENGINE, irp_inputs, initial_prices_wrapped, volumes_wrapped, [], horizon)
+    baseline_df, baseline_events, baseline_stats = result_cache().get_or_compute(baseline_key, run_baseline)
     st.session_state["baseline_df"] = baseline_df
+    st.session_state["baseline_events"] = baseline_events
+    st.session_state["baseline_stats"] = baseline_stats
+    st.session_state["baseline_stats_cached"] = not baseline_ran
     st.session_state["irp_inputs"] = irp_inputs
+    st.session_state["baseline_inputs"] = (initial_prices_wrapped, volumes_wrapped)
     st.success("Baseline simulation complete.")
 
 # Step 2: Scenario
@@ -84,9 +224,9 @@ if "baseline_df" in st.session_state:
         with col1:
             country = st.selectbox(f"Country", options=all_countries, key=f"intv_country_{i}")
         with col2:
-            year = st.selectbox("Year", list(range(2025, 2036)), key=f"intv_year_{i}")
+            year = st.selectbox("Year", sorted({y for y, _ in horizon_months}), key=f"intv_year_{i}")
         with col3:
-            month = st.selectbox("Month", list(range(1, 13)), key=f"intv_month_{i}")
+            month = st.selectbox("Month", [m for y, m in horizon_months if y == year], key=f"intv_month_{i}")
         mode = st.radio("Change Mode", ["Percent", "Absolute"], horizontal=True, key=f"intv_mode_{i}")
         if mode == "Percent":
             value = st.slider("Percent Reduction (%)", 1, 90, 30, key=f"intv_val_{i}")
@@ -102,41 +242,59 @@ if "baseline_df" in st.session_state:
         })
 
     if st.button("▶️ Run Scenario Simulation"):
-        scenario_df = run_irp_simulation_with_interventions(
-            initial_prices=initial_prices_wrapped,
-            volumes=volumes_wrapped,
-            irp_policies=st.session_state["irp_inputs"],
-            interventions=interventions,
-            years=10,
-            start_year=2025,
-            start_month=1
+        # Prices or volumes edited since the baseline run need a full re-run
+        reuse_baseline = (
+            SIMULATION_ENGINE == "numpy"
+            and st.session_state.get("baseline_inputs") == (initial_prices_wrapped, volumes_wrapped)
         )
 
-        baseline_df = st.session_state["baseline_df"]
+        scenario_ran = []
 
-        baseline_df = st.session_state["baseline_df"]
-        scenario_df = scenario_df.copy()
+        def run_scenario():
+            scenario_ran.append(True)
+            scenario_events = EventLog()
+            scenario_stats = SimulationStats()
+            scenario_df = run_irp_simulation_with_interventions(
+                initial_prices=initial_prices_wrapped,
+                volumes=volumes_wrapped,
+                irp_policies=st.session_state["irp_inputs"],
+                interventions=interventions,
+                **horizon,
+                engine=SIMULATION_ENGINE,
+                baseline=st.session_state["baseline_df"] if reuse_baseline else None,
+                rationale=False,
+                event_log=scenario_events,
+                baseline_events=st.session_state["baseline_events"],
+                stats=scenario_stats
+            )
+            return scenario_df, scenario_events, scenario_stats
 
-        merged = pd.merge(
-            scenario_df,
-            baseline_df,
-            on=["Drug", "Country", "Year", "Month"],
-            suffixes=("_Scenario", "_Baseline")
+        # The incremental and the full run give the same result, so both share a key
+        scenario_key = input_key(
+            SIMULATION_ENGINE, st.session_state["irp_inputs"], initial_prices_wrapped, volumes_wrapped, interventions, horizon
         )
-
-        merged["Revenue_Diff"] = merged["Revenue_Baseline"] - merged["Revenue_Scenario"]
-        st.session_state["results_df"] = merged
+        try:
+            scenario_df, scenario_events, scenario_stats = result_cache().get_or_compute(scenario_key, run_scenario)
+        except ValueError as error:
+            st.error(str(error))
+            st.stop()
+        st.session_state["scenario_df"] = scenario_df
+        st.session_state["scenario_events"] = scenario_events
+        st.session_state["scenario_stats"] = scenario_stats
+        st.session_state["scenario_stats_cached"] = not scenario_ran
+        # Charts read these totals on every rerun; the monthly frames are only
+        # compared row by row for the detailed table.
+        st.session_state["results_cube"] = comparison_cube(st.session_state["baseline_df"], scenario_df)
         st.success("Scenario simulation complete.")
 
 # Step 3: Results
-if "results_df" in st.session_state:
+if "results_cube" in st.session_state:
     st.markdown("---")
 
     st.markdown("## 📊 Step 3: Results")
 
-    merged = st.session_state["results_df"]
-    summary = merged.groupby("Country")[["Revenue_Baseline", "Revenue_Scenario"]].sum().reset_index()
-    summary["Impacted"] = summary["Revenue_Scenario"] < summary["Revenue_Baseline"]
+    cube = st.session_state["results_cube"]
+    summary = cube.country.reset_index()
 
     view_option = st.selectbox("Filter countries for bar chart:", ["Only impacted countries", "All countries"])
     summary_filtered = summary if view_option == "All countries" else summary[summary["Impacted"]]
@@ -152,16 +310,35 @@ if "results_df" in st.session_state:
     st.bar_chart(summary_melted.pivot(index="Country", columns="Scenario", values="Total Revenue (€)"))
 
     st.markdown("### 📈 Revenue Over Time")
-    df_time = merged.groupby(["Year", "Month", "Country"])[["Revenue_Baseline", "Revenue_Scenario"]].sum().reset_index()
-    df_time["Date"] = pd.to_datetime(df_time["Year"].astype(str) + "-" + df_time["Month"].astype(str) + "-01")
-
+    country_options = cube.country.index.tolist()
     impacted_countries = summary[summary["Impacted"]]["Country"].tolist()
-    default_country = impacted_countries[0] if impacted_countries else merged["Country"].unique()[0]
-    country_select = st.selectbox("Select country to view trend", options=merged["Country"].unique().tolist(), index=list(merged["Country"].unique()).index(default_country))
-    df_country = df_time[df_time["Country"] == country_select].sort_values("Date")
-    st.line_chart(df_country.set_index("Date")[["Revenue_Baseline", "Revenue_Scenario"]])
+    default_country = impacted_countries[0] if impacted_countries else country_options[0]
+    country_select = st.selectbox("Select country to view trend", options=country_options, index=country_options.index(default_country))
+    st.line_chart(cube.country_month.loc[country_select, ["Revenue_Baseline", "Revenue_Scenario"]])
 
     st.markdown("### 🧾 Detailed Results Table")
-    st.dataframe(merged[["Country", "Year", "Month", "Price_Baseline", "Rationale_Baseline", "Revenue_Baseline", "Price_Scenario", "Rationale_Scenario", "Revenue_Scenario", "Revenue_Diff"]])
+    # Rationale text is only built from the event logs when asked for
+    if st.checkbox("Show detailed table and CSV export"):
+        baseline_df, scenario_df = st.session_state["baseline_df"], st.session_state["scenario_df"]
+        detailed = comparison_frame(baseline_df, scenario_df)
+        baseline_rows, scenario_rows = align_results(baseline_df, scenario_df)
+        detailed["Rationale_Scenario"] = with_rationale(scenario_df, st.session_state["scenario_events"])["Rationale"].to_numpy()[scenario_rows]
+        detailed["Rationale_Baseline"] = with_rationale(baseline_df, st.session_state["baseline_events"])["Rationale"].to_numpy()[baseline_rows]
+        st.dataframe(detailed[["Country", "Year", "Month", "Price_Baseline", "Rationale_Baseline", "Revenue_Baseline", "Price_Scenario", "Rationale_Scenario", "Revenue_Scenario", "Revenue_Diff"]])
+
+        st.download_button("Download Results CSV", data=detailed.to_csv(index=False), file_name="irp_results.csv")
 
-    st.download_button("Download Results CSV", data=merged.to_csv(index=False), file_name="irp_results.csv")
+# Statistics of whichever runs exist, the baseline's as soon as it has run
+run_stats_keys = [
+    (label, key) for label, key in [("Baseline", "baseline_stats"), ("Scenario", "scenario_stats")]
+    if st.session_state.get(key) is not None
+]
+if run_stats_keys:
+    with st.expander("⏱️ Run Statistics", expanded=False):
+        for label, key in run_stats_keys:
+            run_stats = st.session_state[key]
+            # A cached result carries the statistics of the run that produced it
+            cached = ", cached result: timings are from the original run" if st.session_state.get(f"{key}_cached") else ""
+            st.markdown(f"**{label} run** ({run_stats.total_seconds:.3f}s{cached})")
+            st.dataframe(pd.DataFrame([run_stats.counters()]))
+            st.dataframe(run_stats.phase_frame())
@@ -1,5 +1,6 @@
 
 import streamlit as st
+from irp_data import dataset_frame, load_dataset
 
 st.set_page_config(page_title="HERCULES IRP - Choose Mode", layout="centered")
 
@@ -41,9 +42,16 @@ st.markdown("---")
 st.markdown("## 📥 Optional: Upload Your Pricing & Volume Data")
 st.caption("Use your own dataset for pricing and volume assumptions in either mode.")
 
-uploaded_file = st.file_uploader("Upload a CSV file (with country, price, volume)", type=["csv"])
+uploaded_file = st.file_uploader("Upload a CSV or Parquet file (with country, price, volume)", type=["csv", "parquet"])
 
 if uploaded_file:
-    df_uploaded = st.read_csv(uploaded_file)
-    st.success("File uploaded successfully!")
-    st.dataframe(df_uploaded.head())
+    # Streamed in chunks straight into arrays; the simulator page picks the
+    # dataset up from the session.
+    try:
+        dataset = load_dataset(uploaded_file)
+    except ValueError as error:
+        st.error(str(error))
+    else:
+        st.session_state["dataset"] = dataset
+        st.success("File uploaded successfully!")
+        st.dataframe(dataset_frame(dataset).head())
@@ -0,0 +1,172 @@
+# Benchmarks the monthly simulator and the legacy annual one on synthetic
+# portfolios. Run from the repository root:
+#
+#   python -m benchmarks.run --output results.json
+#   python -m benchmarks.run --output new.json --compare results.json
+#
+# Each axis (drugs, countries, years, basket density, interventions) is swept
+# on its own around a base case. --compare exits with status 1 when a case
+# is slower or uses more memory than the baseline file allows.
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+import Simulator
+import simulator
+from benchmarks.synthetic import generate_portfolio
+
+BASE_CASE = {"drugs": 5, "countries": 107, "years": 10, "basket_density": 0.2, "interventions": 10}
+SWEEPS = {
+    "drugs": [1, 5, 25, 100],
+    "countries": [25, 50, 107, 200],
+    "years": [5, 10, 30],
+    "basket_density": [0.05, 0.2, 0.5],
+    "interventions": [0, 10, 100, 1000],
+}
+QUICK_SWEEPS = {
+    "drugs": [1, 5],
+    "countries": [25, 107],
+    "years": [5, 10],
+    "basket_density": [0.05, 0.2],
+    "interventions": [0, 100],
+}
+
+
+def _run_monthly(engine):
+    def run(portfolio):
+        return simulator.run_irp_simulation_with_interventions(
+            portfolio.initial_prices, portfolio.volumes, portfolio.irp_policies,
+            portfolio.interventions, years=portfolio.years, engine=engine
+        )
+    return run
+
+
+def _run_annual(portfolio):
+    return Simulator.run_irp_simulation_with_intervention(
+        portfolio.initial_prices, portfolio.annual_volumes, portfolio.annual_policies,
+        portfolio.annual_intervention, years=portfolio.years
+    )
+
+
+TARGETS = {
+    "simulator.dict": _run_monthly("dict"),
+    "simulator.numpy": _run_monthly("numpy"),
+    "Simulator.annual": _run_annual,
+}
+
+
+def cases(sweeps):
+    seen = set()
+    for axis, values in sweeps.items():
+        for value in values:
+            params = dict(BASE_CASE, **{axis: value})
+            key = tuple(sorted(params.items()))
+            if key not in seen:
+                seen.add(key)
+                yield params
+
+
+def case_name(target, params):
+    return target + "[" + ",".join(f"{k}={params[k]}" for k in BASE_CASE) + "]"
+
+
+def measure(run, portfolio, repeat):
+    # Best wall time of `repeat` plain runs, then one run under tracemalloc
+    # for the peak Python/NumPy allocation; tracing slows the run down, so it
+    # is kept out of the timings.
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run(portfolio)
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        run(portfolio)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "seconds": min(timings),
+        "seconds_all": timings,
+        "peak_mb": peak / 2 ** 20,
+        "rows": len(result),
+    }
+
+
+def run_benchmarks(targets, sweeps, repeat=3, seed=0, log=print):
+    results = []
+    for params in cases(sweeps):
+        portfolio = generate_portfolio(seed=seed, **params)
+        for target in targets:
+            entry = {"name": case_name(target, params), "target": target, "params": params}
+            entry.update(measure(TARGETS[target], portfolio, repeat))
+            log(f"{entry['name']}: {entry['seconds']:.3f}s, peak {entry['peak_mb']:.1f} MB")
+            results.append(entry)
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, time_tolerance=0.25, memory_tolerance=0.25, min_seconds=0.05):
+    # Cases slower than baseline * (1 + time_tolerance) or with a peak above
+    # baseline * (1 + memory_tolerance). Cases faster than min_seconds in the
+    # baseline are too noisy to judge on time.
+    previous = {entry["name"]: entry for entry in baseline["results"]}
+    regressions = []
+    for entry in current["results"]:
+        old = previous.get(entry["name"])
+        if old is None:
+            continue
+        if old["seconds"] >= min_seconds and entry["seconds"] > old["seconds"] * (1 + time_tolerance):
+            regressions.append((entry["name"], "time", old["seconds"], entry["seconds"]))
+        if entry["peak_mb"] > old["peak_mb"] * (1 + memory_tolerance):
+            regressions.append((entry["name"], "memory", old["peak_mb"], entry["peak_mb"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the IRP simulators on synthetic portfolios.")
+    parser.add_argument("--output", default="benchmark_results.json", help="where to write the results (JSON)")
+    parser.add_argument("--compare", metavar="BASELINE", help="results file to check for regressions against")
+    parser.add_argument("--targets", nargs="+", choices=list(TARGETS), default=list(TARGETS))
+    parser.add_argument("--quick", action="store_true", help="smaller sweep for a fast check")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--time-tolerance", type=float, default=0.25)
+    parser.add_argument("--memory-tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    current = run_benchmarks(args.targets, QUICK_SWEEPS if args.quick else SWEEPS, args.repeat, args.seed)
+    with open(args.output, "w") as f:
+        json.dump(current, f, indent=2)
+    print(f"Wrote {len(current['results'])} results to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.time_tolerance, args.memory_tolerance)
+        for name, kind, old, new in regressions:
+            unit = "s" if kind == "time" else " MB"
+            print(f"REGRESSION {name}: {kind} {old:.3f}{unit} -> {new:.3f}{unit} ({new / old - 1:+.0%})")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+import random
+from collections import namedtuple
+from dummy_data import dummy_prices
+from irp_policies import irp_policies
+
+# Everything one benchmark case needs. Monthly inputs feed
+# simulator.run_irp_simulation_with_interventions; the annual_* fields are the
+# same portfolio in the shapes Simulator.run_irp_simulation_with_intervention
+# expects (yearly volumes, frequency and delay in years, one intervention).
+Portfolio = namedtuple(
+    "Portfolio",
+    [
+        "initial_prices", "volumes", "irp_policies", "interventions", "years",
+        "annual_volumes", "annual_policies", "annual_intervention"
+    ]
+)
+
+
+def country_names(count):
+    names = list(dummy_prices)
+    return names[:count] + [f"Country {i + 1}" for i in range(len(names), count)]
+
+
+def generate_portfolio(drugs=5, countries=107, years=10, basket_density=0.2, interventions=10, seed=0):
+    # Synthetic portfolio shaped like irp_policies and dummy_data: rules,
+    # frequencies, delays, review months and performs_irp flags are drawn
+    # from the real policies, prices from the dummy price range. Each IRP
+    # country's basket holds about basket_density of the other countries.
+    rnd = random.Random(seed)
+    names = country_names(countries)
+    templates = list(irp_policies.values())
+    low, high = min(dummy_prices.values()), max(dummy_prices.values())
+    total_months = years * 12
+
+    policies = {}
+    for country in names:
+        template = rnd.choice(templates)
+        others = [c for c in names if c != country]
+        size = max(1, round(basket_density * len(others)))
+        performs_irp = template.get("performs_irp", True)
+        policies[country] = {
+            "basket": rnd.sample(others, min(size, len(others))) if performs_irp else [],
+            "rule": template["rule"],
+            "frequency": template["frequency"],
+            "enforcement_delay": template["enforcement_delay"],
+            "allow_increase": template["allow_increase"],
+            "review_month": template.get("review_month"),
+            "performs_irp": performs_irp,
+        }
+
+    initial_prices = {}
+    volumes = {}
+    annual_volumes = {}
+    for d in range(drugs):
+        drug = f"Drug {d + 1}"
+        scale = rnd.uniform(0.5, 20)
+        initial_prices[drug] = {c: round(rnd.uniform(low, high) * scale, 2) for c in names}
+        volumes[drug] = {}
+        annual_volumes[drug] = {}
+        for c in names:
+            base = rnd.randint(50, 5000)
+            growth = rnd.uniform(-0.01, 0.02)
+            monthly = [round(base * (1 + growth) ** (m / 12)) for m in range(total_months + 1)]
+            volumes[drug][c] = dict(enumerate(monthly))
+            annual_volumes[drug][c] = {y: sum(monthly[y * 12:(y + 1) * 12]) for y in range(years + 1)}
+
+    planned = []
+    for _ in range(interventions):
+        drug = rnd.choice(list(initial_prices))
+        percent = rnd.random() < 0.7
+        m = rnd.randint(1, total_months)
+        planned.append({
+            "drug": drug,
+            "country": rnd.choice(names),
+            "year": 2025 + m // 12,
+            "month": m % 12 + 1,
+            "mode": "percent" if percent else "absolute",
+            "value": rnd.randint(1, 40) if percent else round(rnd.uniform(low, high), 2),
+        })
+
+    # The annual simulator rounds every review result, so it needs non-empty
+    # baskets and only knows frequencies and delays in whole years.
+    annual_policies = {
+        country: {
+            "basket": policy["basket"],
+            "rule": policy["rule"],
+            "frequency": max(1, round(policy["frequency"] / 12)),
+            "enforcement_delay": round(policy["enforcement_delay"] / 12),
+        }
+        for country, policy in policies.items()
+        if policy["performs_irp"] and policy["basket"]
+    }
+    annual_intervention = None
+    if planned:
+        first = planned[0]
+        annual_intervention = {
+            "drug": first["drug"],
+            "country": first["country"],
+            "year": max(1, first["year"] - 2025),
+            "reduction_pct": 0.2,
+        }
+
+    return Portfolio(
+        initial_prices, volumes, policies, planned, years,
+        annual_volumes, annual_policies, annual_intervention
+    )
@@ -0,0 +1,215 @@
+import warnings
+import numpy as np
+
+# ISO 3166 alpha-2 and alpha-3 codes followed by every name a country goes by
+# in irp_policies, dummy_data or common uploads.
+COUNTRY_TABLE = [
+    ("AT", "AUT", "Austria"),
+    ("BE", "BEL", "Belgium"),
+    ("BG", "BGR", "Bulgaria"),
+    ("HR", "HRV", "Croatia"),
+    ("CY", "CYP", "Cyprus"),
+    ("CZ", "CZE", "Czech Republic", "Czechia"),
+    ("DK", "DNK", "Denmark"),
+    ("EE", "EST", "Estonia"),
+    ("FI", "FIN", "Finland"),
+    ("FR", "FRA", "France"),
+    ("DE", "DEU", "Germany"),
+    ("GR", "GRC", "Greece"),
+    ("HU", "HUN", "Hungary"),
+    ("IE", "IRL", "Ireland"),
+    ("IT", "ITA", "Italy"),
+    ("LV", "LVA", "Latvia"),
+    ("LT", "LTU", "Lithuania"),
+    ("LU", "LUX", "Luxembourg"),
+    ("MT", "MLT", "Malta"),
+    ("NL", "NLD", "Netherlands"),
+    ("PL", "POL", "Poland"),
+    ("PT", "PRT", "Portugal"),
+    ("RO", "ROU", "Romania"),
+    ("SK", "SVK", "Slovakia"),
+    ("SI", "SVN", "Slovenia"),
+    ("ES", "ESP", "Spain"),
+    ("SE", "SWE", "Sweden"),
+    ("GB", "GBR", "United Kingdom", "UK"),
+    ("IS", "ISL", "Iceland"),
+    ("LI", "LIE", "Liechtenstein"),
+    ("NO", "NOR", "Norway"),
+    ("CH", "CHE", "Switzerland"),
+    ("AL", "ALB", "Albania"),
+    ("AM", "ARM", "Armenia"),
+    ("AZ", "AZE", "Azerbaijan"),
+    ("BY", "BLR", "Belarus"),
+    ("BA", "BIH", "Bosnia & Herz.", "Bosnia and Herzegovina"),
+    ("XK", "XKX", "Kosovo"),
+    ("MK", "MKD", "Macedonia", "North Macedonia"),
+    ("MD", "MDA", "Moldova", "Moldova, Republic of"),
+    ("ME", "MNE", "Montenegro"),
+    ("RU", "RUS", "Russia", "Russian Federation"),
+    ("RS", "SRB", "Serbia"),
+    ("UA", "UKR", "Ukraine"),
+    ("UZ", "UZB", "Uzbekistan"),
+    ("TM", "TKM", "Turkmenistan"),
+    ("KG", "KGZ", "Kyrgyzstan"),
+    ("TJ", "TJK", "Tajikistan"),
+    ("GE", "GEO", "Georgia"),
+    ("BH", "BHR", "Bahrain"),
+    ("EG", "EGY", "Egypt"),
+    ("IR", "IRN", "Iran", "Iran, Islamic Republic of"),
+    ("IL", "ISR", "Israel"),
+    ("JO", "JOR", "Jordan"),
+    ("KZ", "KAZ", "Kazakhstan"),
+    ("KW", "KWT", "Kuwait"),
+    ("LB", "LBN", "Lebanon"),
+    ("OM", "OMN", "Oman"),
+    ("QA", "QAT", "Qatar"),
+    ("SA", "SAU", "Saudi Arabia"),
+    ("TR", "TUR", "Turkey", "Türkiye"),
+    ("AE", "ARE", "UAE", "United Arab Emirates"),
+    ("IQ", "IRQ", "Iraq"),
+    ("AR", "ARG", "Argentina"),
+    ("BZ", "BLZ", "Belize"),
+    ("BO", "BOL", "Bolivia", "Bolivia, Plurinational State of"),
+    ("BR", "BRA", "Brazil"),
+    ("CA", "CAN", "Canada"),
+    ("CL", "CHL", "Chile"),
+    ("CO", "COL", "Colombia"),
+    ("CR", "CRI", "Costa Rica"),
+    ("EC", "ECU", "Ecuador"),
+    ("SV", "SLV", "El Salvador"),
+    ("GT", "GTM", "Guatemala"),
+    ("HN", "HND", "Honduras"),
+    ("MX", "MEX", "Mexico"),
+    ("NI", "NIC", "Nicaragua"),
+    ("PA", "PAN", "Panama"),
+    ("PY", "PRY", "Paraguay"),
+    ("PE", "PER", "Peru"),
+    ("US", "USA", "United States", "United States of America"),
+    ("UY", "URY", "Uruguay"),
+    ("VE", "VEN", "Venezuela", "Venezuela, Bolivarian Republic of"),
+    ("DZ", "DZA", "Algeria"),
+    ("LY", "LBY", "Libya"),
+    ("MA", "MAR", "Morocco"),
+    ("ZA", "ZAF", "South Africa"),
+    ("SD", "SDN", "Sudan"),
+    ("TN", "TUN", "Tunisia"),
+    ("AU", "AUS", "Australia"),
+    ("KH", "KHM", "Cambodia"),
+    ("BN", "BRN", "Brunei", "Brunei Darussalam"),
+    ("CN", "CHN", "China"),
+    ("HK", "HKG", "Hong Kong"),
+    ("IN", "IND", "India"),
+    ("ID", "IDN", "Indonesia"),
+    ("JP", "JPN", "Japan"),
+    ("MY", "MYS", "Malaysia"),
+    ("NZ", "NZL", "New Zealand"),
+    ("PH", "PHL", "Philippines"),
+    ("SG", "SGP", "Singapore"),
+    ("KR", "KOR", "South Korea", "Korea, Republic of"),
+    ("TW", "TWN", "Taiwan", "Taiwan, Province of China"),
+    ("TH", "THA", "Thailand"),
+    ("VN", "VNM", "Vietnam", "Viet Nam"),
+    ("LA", "LAO", "Laos", "Lao People's Democratic Republic"),
+    ("MM", "MMR", "Myanmar"),
+]
+
+
+def _key(name):
+    return " ".join(str(name).casefold().split())
+
+
+_ALIAS_GROUPS = {}
+for _entry in COUNTRY_TABLE:
+    for _name in _entry:
+        _ALIAS_GROUPS[_key(_name)] = _entry
+
+
+def is_known_country(name):
+    # Whether `name` is a name or ISO code in COUNTRY_TABLE
+    return _key(name) in _ALIAS_GROUPS
+
+
+class CountryRegistry:
+    # Maps every alias and ISO code of the given countries to one integer ID.
+    # IDs follow the order of `countries`, and names[id] is the spelling used
+    # there, so IDs can index the country axis of a price array directly.
+
+    def __init__(self, countries):
+        self.names = []
+        self._ids = {}
+        for country in countries:
+            if self.resolve(country) is not None:
+                continue
+            country_id = len(self.names)
+            self.names.append(country)
+            self._ids[_key(country)] = country_id
+            for alias in _ALIAS_GROUPS.get(_key(country), ()):
+                self._ids.setdefault(_key(alias), country_id)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return self.resolve(name) is not None
+
+    def __getitem__(self, name):
+        country_id = self.resolve(name)
+        if country_id is None:
+            raise KeyError(name)
+        return country_id
+
+    def resolve(self, name):
+        return self._ids.get(_key(name))
+
+    def canonical(self, name):
+        country_id = self.resolve(name)
+        return None if country_id is None else self.names[country_id]
+
+    def resolve_basket(self, basket):
+        # IDs of the basket members in the registry, and the names that match
+        # no known country. Known countries outside the registry (not priced
+        # in this run) are left out of both.
+        ids = []
+        unresolved = []
+        for name in basket:
+            country_id = self.resolve(name)
+            if country_id is not None:
+                ids.append(country_id)
+            elif not is_known_country(name):
+                unresolved.append(name)
+        return np.array(ids, dtype=np.int64), unresolved
+
+    def resolve_policies(self, irp_policies):
+        # Rewrites policy keys and baskets to canonical names. Members outside
+        # the registry are dropped; those that match no known country are
+        # returned as {policy country: [names]}.
+        resolved = {}
+        unresolved = {}
+        for country, policy in irp_policies.items():
+            ids, missing = self.resolve_basket(policy.get("basket", []))
+            if missing:
+                unresolved[country] = missing
+            resolved[self.canonical(country) or country] = {
+                **policy,
+                "basket": [self.names[i] for i in ids],
+            }
+        return resolved, unresolved
+
+
+def registry_for_prices(initial_prices):
+    countries = []
+    for drug_prices in initial_prices.values():
+        countries.extend(drug_prices)
+    return CountryRegistry(countries)
+
+
+def resolve_policies_for_prices(irp_policies, initial_prices):
+    registry = registry_for_prices(initial_prices)
+    resolved, unresolved = registry.resolve_policies(irp_policies)
+    if unresolved:
+        names = sorted({name for missing in unresolved.values() for name in missing})
+        warnings.warn(
+            f"Unknown basket countries dropped from IRP baskets: {', '.join(names)}",
+            stacklevel=3
+        )
+    return registry, resolved, unresolved
@@ -0,0 +1,68 @@
+from collections import namedtuple
+
+MODES = ("percent", "absolute")
+FIELDS = ("drug", "country", "year", "month", "mode", "value")
+
+# A validated intervention: `month` is the month index into the simulation
+# horizon and `country` the registry's spelling of the country.
+Intervention = namedtuple("Intervention", ["month", "drug", "country", "mode", "value"])
+
+
+def priced_countries(initial_prices, registry):
+    # {drug: set of country IDs the drug has a price in}
+    return {
+        drug: {registry.resolve(country) for country in countries}
+        for drug, countries in initial_prices.items()
+    }
+
+
+def validate_interventions(interventions, priced, registry, month_map):
+    # Checks every intervention against the simulated drugs (the keys of
+    # `priced`), the countries priced for that drug and the horizon, and
+    # returns them as Interventions in list order. All problems are reported
+    # together in one ValueError.
+    month_lookup = {ym: m for m, ym in enumerate(month_map)}
+    first, last = month_map[0], month_map[-1]
+
+    validated = []
+    errors = []
+    for i, event in enumerate(interventions or []):
+        missing = [field for field in FIELDS if field not in event]
+        if missing:
+            errors.append(f"Intervention {i + 1}: missing {', '.join(missing)}")
+            continue
+        drug, country = event["drug"], event["country"]
+        m = month_lookup.get((event["year"], event["month"]))
+        country_id = registry.resolve(country)
+        problems = []
+        if drug not in priced:
+            problems.append(f"unknown drug {drug!r}")
+        elif country_id is None or country_id not in priced[drug]:
+            problems.append(f"{country!r} has no price for {drug!r}")
+        if m is None:
+            problems.append(f"outside the simulated horizon {first[0]}-{first[1]} to {last[0]}-{last[1]}")
+        if event["mode"] not in MODES:
+            problems.append(f"mode must be one of {', '.join(MODES)}, got {event['mode']!r}")
+        if problems:
+            label = f"Intervention {i + 1} ({drug}, {country}, {event['year']}-{event['month']})"
+            errors.extend(f"{label}: {problem}" for problem in problems)
+        else:
+            validated.append(Intervention(m, drug, registry.names[country_id], event["mode"], event["value"]))
+    if errors:
+        raise ValueError("Invalid interventions:\n" + "\n".join(errors))
+    return validated
+
+
+def index_by_month(interventions):
+    # {month index: [Intervention]} keeping list order within a month
+    by_month = {}
+    for event in interventions:
+        by_month.setdefault(event.month, []).append(event)
+    return by_month
+
+
+def index_by_month_and_drug(interventions):
+    by_key = {}
+    for event in interventions:
+        by_key.setdefault((event.month, event.drug), []).append(event)
+    return by_key
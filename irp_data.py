@@ -0,0 +1,320 @@
+import json
+import os
+from collections import namedtuple
+from collections.abc import Mapping
+import numpy as np
+import pandas as pd
+
+DATASET_VERSION = 1
+# Rows read per chunk when streaming CSV or Parquet input
+CHUNK_ROWS = 200_000
+
+# Prices and volumes as arrays: prices is drugs x countries (NaN where a drug
+# has no price), volumes drugs x countries x months starting at
+# (start_year, 1). Either array may be a read-only memory map. policies is
+# a dict shaped like irp_policies, or None.
+Dataset = namedtuple("Dataset", ["drugs", "countries", "start_year", "prices", "volumes", "policies"])
+
+COLUMN_ALIASES = {
+    "drug": "drug", "product": "drug",
+    "country": "country",
+    "price": "price", "initial_price": "price",
+    "volume": "volume", "volumes": "volume",
+    "year": "year",
+    "month": "month",
+    "basket": "basket",
+    "rule": "rule",
+    "frequency": "frequency",
+    "enforcement_delay": "enforcement_delay", "delay": "enforcement_delay",
+    "allow_increase": "allow_increase",
+    "review_month": "review_month",
+    "performs_irp": "performs_irp",
+}
+
+
+class VolumeSeries(Mapping):
+    # {month: volume} view over one row of a volume array
+    def __init__(self, array):
+        self.array = array
+
+    def __getitem__(self, month):
+        if not isinstance(month, (int, np.integer)) or not 0 <= month < len(self.array):
+            raise KeyError(month)
+        return self.array[month].item()
+
+    def __iter__(self):
+        return iter(range(len(self.array)))
+
+    def __len__(self):
+        return len(self.array)
+
+
+class VolumeTable(Mapping):
+    # {drug: {country: {month: volume}}} view over a Dataset's volume array,
+    # so datasets can be passed wherever volume dicts are expected without
+    # building them.
+    def __init__(self, drugs, countries, volumes):
+        self.drug_index = {d: i for i, d in enumerate(drugs)}
+        self.countries = countries
+        self.volumes = volumes
+
+    def __getitem__(self, drug):
+        rows = self.volumes[self.drug_index[drug]]
+        return {country: VolumeSeries(rows[c]) for c, country in enumerate(self.countries)}
+
+    def __iter__(self):
+        return iter(self.drug_index)
+
+    def __len__(self):
+        return len(self.drug_index)
+
+
+def series_values(series, months):
+    # Monthly volumes of one drug and country as an array of length `months`,
+    # 0 where no volume is given
+    values = np.zeros(months)
+    if isinstance(series, VolumeSeries):
+        n = min(months, len(series.array))
+        values[:n] = series.array[:n]
+        return values
+    for m, volume in series.items():
+        if 0 <= m < months:
+            values[m] = volume
+    return values
+
+
+def dataset_prices(dataset):
+    # {drug: {country: price}} for the simulators
+    return {
+        drug: {
+            dataset.countries[c]: float(dataset.prices[d, c])
+            for c in np.flatnonzero(~np.isnan(dataset.prices[d]))
+        }
+        for d, drug in enumerate(dataset.drugs)
+    }
+
+
+def dataset_volumes(dataset):
+    return VolumeTable(dataset.drugs, dataset.countries, dataset.volumes)
+
+
+def _source_name(source):
+    return str(getattr(source, "name", source) if not isinstance(source, os.PathLike) else source)
+
+
+def iter_table(source, chunksize=CHUNK_ROWS):
+    # Yields a CSV or Parquet table (path or file object) in chunks of about
+    # `chunksize` rows with normalised column names. DataFrames pass through.
+    if isinstance(source, pd.DataFrame):
+        chunks = [source]
+    elif _source_name(source).lower().endswith((".parquet", ".pq")):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            chunks = [pd.read_parquet(source)]
+        else:
+            batches = pq.ParquetFile(source).iter_batches(batch_size=chunksize)
+            chunks = (batch.to_pandas() for batch in batches)
+    else:
+        chunks = pd.read_csv(source, chunksize=chunksize, skipinitialspace=True)
+    for chunk in chunks:
+        columns = {}
+        for column in chunk.columns:
+            key = str(column).strip().lower().replace(" ", "_")
+            if key in COLUMN_ALIASES:
+                columns[column] = COLUMN_ALIASES[key]
+        yield chunk.rename(columns=columns)
+
+
+def _codes(values, index):
+    # Integer codes of `values`, adding unseen names to `index` in order
+    names = values.astype(str).str.strip()
+    for name in names.unique():
+        index.setdefault(name, len(index))
+    return names.map(index).to_numpy(np.int32)
+
+
+def _scan_prices_volumes(sources, drug, start_year, months, chunksize):
+    # Streams the tables into compact code arrays: (drug, country, price)
+    # and (drug, country, month, volume), month -1 meaning every month.
+    drug_index, country_index = {}, {}
+    price_parts, volume_parts = [], []
+    seen = set()
+    for source in sources:
+        if source is None or id(source) in seen:
+            continue
+        seen.add(id(source))
+        for chunk in iter_table(source, chunksize):
+            if "country" not in chunk:
+                raise ValueError(f"{_source_name(source)}: missing a Country column")
+            chunk = chunk.dropna(subset=["country"])
+            if "drug" in chunk:
+                d = _codes(chunk["drug"], drug_index)
+            else:
+                d = np.full(len(chunk), drug_index.setdefault(drug, len(drug_index)), dtype=np.int32)
+            c = _codes(chunk["country"], country_index)
+            if "price" in chunk:
+                price = pd.to_numeric(chunk["price"], errors="coerce").to_numpy(float)
+                keep = ~np.isnan(price)
+                price_parts.append((d[keep], c[keep], price[keep]))
+            if "volume" in chunk:
+                volume = pd.to_numeric(chunk["volume"], errors="coerce").to_numpy(float)
+                if "year" in chunk and "month" in chunk:
+                    year = pd.to_numeric(chunk["year"], errors="coerce").to_numpy(float)
+                    month = pd.to_numeric(chunk["month"], errors="coerce").to_numpy(float)
+                    m = (year - start_year) * 12 + month - 1
+                    every_month = np.isnan(year) & np.isnan(month)
+                    keep = ~np.isnan(volume) & (every_month | ((m >= 0) & (m < months)))
+                    m = np.where(every_month, -1, m)[keep].astype(np.int32)
+                else:
+                    keep = ~np.isnan(volume)
+                    m = np.full(int(keep.sum()), -1, dtype=np.int32)
+                volume_parts.append((d[keep], c[keep], m, volume[keep]))
+    return drug_index, country_index, price_parts, volume_parts
+
+
+def load_dataset(prices, volumes=None, policies=None, years=10, start_year=2025, drug="Drug 1", chunksize=CHUNK_ROWS):
+    # Builds a Dataset from CSV or Parquet tables (paths, file objects such as
+    # Streamlit uploads, or DataFrames), streamed in chunks so only compact
+    # code arrays and the final arrays are held in memory.
+    #   prices:   Drug, Country, Price; may also carry the volume columns
+    #   volumes:  Drug, Country, Volume and optionally Year, Month; rows
+    #             without Year/Month apply to every month
+    #   policies: see load_policies
+    # Without a Drug column every row belongs to `drug`. Later rows win.
+    months = years * 12 + 1
+    drug_index, country_index, price_parts, volume_parts = _scan_prices_volumes(
+        [prices, volumes], drug, start_year, months, chunksize
+    )
+    if not price_parts:
+        raise ValueError("No prices found; expected a Price column")
+
+    price_array = np.full((len(drug_index), len(country_index)), np.nan)
+    for d, c, price in price_parts:
+        price_array[d, c] = price
+    volume_array = np.zeros((len(drug_index), len(country_index), months))
+    for d, c, m, volume in volume_parts:
+        # Runs of rows for every month and for one month are written in file
+        # order, so a later row overrides an earlier one of either kind
+        flat = m < 0
+        bounds = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+        for start, stop in zip([0, *bounds], [*bounds, len(m)]):
+            if start == stop:
+                continue
+            run = slice(start, stop)
+            if flat[start]:
+                volume_array[d[run], c[run], :] = volume[run, None]
+            else:
+                volume_array[d[run], c[run], m[run]] = volume[run]
+
+    return Dataset(
+        list(drug_index),
+        list(country_index),
+        start_year,
+        price_array,
+        volume_array,
+        load_policies(policies, chunksize) if policies is not None else None
+    )
+
+
+def _flag(value, default):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return default
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "y")
+    return bool(value)
+
+
+def load_policies(source, chunksize=CHUNK_ROWS):
+    # {country: policy} shaped like irp_policies from a table with Country,
+    # Basket (country names separated by ';'), Rule, Frequency and
+    # Enforcement_Delay in months, and optionally Allow_Increase,
+    # Review_Month and Performs_IRP.
+    policies = {}
+    for chunk in iter_table(source, chunksize):
+        missing = [c for c in ("country", "basket", "rule", "frequency", "enforcement_delay") if c not in chunk]
+        if missing:
+            raise ValueError(f"{_source_name(source)}: missing policy columns {', '.join(missing)}")
+        for row in chunk.to_dict("records"):
+            basket = row["basket"] if isinstance(row["basket"], str) else ""
+            review_month = row.get("review_month")
+            policies[str(row["country"]).strip()] = {
+                "basket": [c.strip() for c in basket.split(";") if c.strip()],
+                "rule": str(row["rule"]).strip().lower(),
+                "frequency": int(row["frequency"]),
+                "enforcement_delay": int(row["enforcement_delay"]),
+                "allow_increase": _flag(row.get("allow_increase"), False),
+                "review_month": None if review_month is None or pd.isna(review_month) else int(review_month),
+                "performs_irp": _flag(row.get("performs_irp"), True),
+            }
+    return policies
+
+
+def dataset_from_dicts(initial_prices, volumes, irp_policies=None, years=10, start_year=2025):
+    # Dataset from the dict inputs the simulators take, e.g. dummy_data
+    drugs = list(initial_prices)
+    countries = list(dict.fromkeys(c for prices in initial_prices.values() for c in prices))
+    country_index = {c: i for i, c in enumerate(countries)}
+    months = years * 12 + 1
+    price_array = np.full((len(drugs), len(countries)), np.nan)
+    volume_array = np.zeros((len(drugs), len(countries), months))
+    for d, drug in enumerate(drugs):
+        for country, price in initial_prices[drug].items():
+            price_array[d, country_index[country]] = price
+        for country, series in volumes.get(drug, {}).items():
+            if country in country_index:
+                volume_array[d, country_index[country]] = series_values(series, months)
+    return Dataset(drugs, countries, start_year, price_array, volume_array, irp_policies)
+
+
+def save_dataset(dataset, directory):
+    # Writes prices.npy, volumes.npy and meta.json to `directory`; the arrays
+    # can be memory-mapped by open_dataset.
+    os.makedirs(directory, exist_ok=True)
+    np.save(os.path.join(directory, "prices.npy"), np.ascontiguousarray(dataset.prices, dtype=np.float64))
+    np.save(os.path.join(directory, "volumes.npy"), np.ascontiguousarray(dataset.volumes, dtype=np.float64))
+    meta = {
+        "version": DATASET_VERSION,
+        "drugs": list(dataset.drugs),
+        "countries": list(dataset.countries),
+        "start_year": dataset.start_year,
+        "policies": dataset.policies,
+    }
+    with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+def open_dataset(directory, mmap=True):
+    # Reopens a dataset written by save_dataset. With mmap=True the arrays are
+    # read-only memory maps and pages are only read when touched.
+    with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("version") != DATASET_VERSION:
+        raise ValueError(f"{directory}: unsupported dataset version {meta.get('version')}")
+    mode = "r" if mmap else None
+    prices = np.load(os.path.join(directory, "prices.npy"), mmap_mode=mode)
+    volumes = np.load(os.path.join(directory, "volumes.npy"), mmap_mode=mode)
+    drugs, countries = meta["drugs"], meta["countries"]
+    if prices.shape != (len(drugs), len(countries)) or volumes.shape[:2] != prices.shape:
+        raise ValueError(f"{directory}: array shapes do not match the drug and country lists")
+    return Dataset(drugs, countries, meta["start_year"], prices, volumes, meta["policies"])
+
+
+def dataset_frame(dataset, drug=None):
+    # Preview table of a dataset: one row per priced drug and country with
+    # the month-0 volume
+    rows = []
+    for d, name in enumerate(dataset.drugs):
+        if drug is not None and name != drug:
+            continue
+        for c in np.flatnonzero(~np.isnan(dataset.prices[d])):
+            rows.append((name, dataset.countries[c], float(dataset.prices[d, c]), float(dataset.volumes[d, c, 0])))
+    return pd.DataFrame(rows, columns=["Drug", "Country", "Price", "Volume"])
+
+
+if __name__ == "__main__":
+    # python irp_data.py OUT_DIR: converts dummy_data and irp_policies
+    import sys
+    from dummy_data import dummy_prices, dummy_volumes
+    from irp_policies import irp_policies
+    save_dataset(dataset_from_dicts({"Drug 1": dummy_prices}, {"Drug 1": dummy_volumes}, irp_policies), sys.argv[1])
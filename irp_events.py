@@ -0,0 +1,165 @@
+import numpy as np
+import pandas as pd
+
+EVENT_COLUMNS = [
+    "Type", "Drug", "Country", "Year", "Month", "Rule", "Collected_Year", "Collected_Month",
+    "Basket", "Price_Before", "Price_After", "Mode", "Value"
+]
+
+
+def format_price(price):
+    # price != price is the NaN test, without a NumPy call per basket member
+    if price is None or price != price:
+        return "N/A"
+    return str(float(price))
+
+
+class EventLog:
+    # Compact record of every price change a simulation applies. One entry per
+    # IRP event or intervention, stored column-wise; the basket column holds a
+    # reference to the policy's basket tuple, not a copy. Rationale strings
+    # are only built on request from the log and the final prices.
+
+    _fields = (
+        "type", "drug", "country", "month", "rule", "collected_at", "basket",
+        "price_before", "price_after", "mode", "value"
+    )
+
+    def __init__(self):
+        self.month_map = None
+        self.type = []
+        self.drug = []
+        self.country = []
+        self.month = []
+        self.rule = []
+        self.collected_at = []
+        self.basket = []
+        self.price_before = []
+        self.price_after = []
+        self.mode = []
+        self.value = []
+
+    def __len__(self):
+        return len(self.type)
+
+    def record_irp(self, drug, country, month, rule, collected_at, basket, price_before, price_after):
+        self._append("irp", drug, country, month, rule, collected_at, basket, price_before, price_after, None, None)
+
+    def record_intervention(self, drug, country, month, mode, value, price_before, price_after):
+        self._append("intervention", drug, country, month, None, None, None, price_before, price_after, mode, value)
+
+    def _append(self, kind, drug, country, month, rule, collected_at, basket, price_before, price_after, mode, value):
+        self.type.append(kind)
+        self.drug.append(drug)
+        self.country.append(country)
+        self.month.append(month)
+        self.rule.append(rule)
+        self.collected_at.append(collected_at)
+        self.basket.append(basket)
+        self.price_before.append(price_before)
+        self.price_after.append(price_after)
+        self.mode.append(mode)
+        self.value.append(value)
+
+    def extend(self, other, keep=None):
+        # Appends entries of `other`, optionally only those where keep(i) is true
+        for i in range(len(other)):
+            if keep is None or keep(i):
+                self._append(*(getattr(other, name)[i] for name in self._fields))
+
+    def select(self, rows):
+        # New log holding the entries at `rows`, in that order
+        selected = EventLog()
+        selected.month_map = self.month_map
+        for name in self._fields:
+            column = getattr(self, name)
+            setattr(selected, name, [column[i] for i in rows])
+        return selected
+
+    def relabel(self, drugs=None, countries=None):
+        # Engines log drug and country indices; swap them for names. Any
+        # mapping indexable by the logged keys works.
+        if drugs is not None:
+            self.drug = [drugs[d] for d in self.drug]
+        if countries is not None:
+            self.country = [countries[c] for c in self.country]
+
+    def to_frame(self):
+        month_map = self.month_map
+        collected = [month_map[m] if m is not None else (None, None) for m in self.collected_at]
+        return pd.DataFrame({
+            "Type": pd.Categorical(self.type, categories=["irp", "intervention"]),
+            "Drug": pd.Categorical(self.drug),
+            "Country": pd.Categorical(self.country),
+            "Year": [month_map[m][0] for m in self.month],
+            "Month": [month_map[m][1] for m in self.month],
+            "Rule": self.rule,
+            "Collected_Year": pd.array([year for year, _ in collected], dtype="Int64"),
+            "Collected_Month": pd.array([month for _, month in collected], dtype="Int64"),
+            "Basket": [", ".join(basket) if basket is not None else None for basket in self.basket],
+            "Price_Before": np.array(self.price_before, dtype=float),
+            "Price_After": np.array(self.price_after, dtype=float),
+            "Mode": self.mode,
+            "Value": self.value,
+        }, columns=EVENT_COLUMNS)
+
+    def referencing(self, country, cuts_only=True):
+        # IRP events whose basket includes `country`, e.g. every IRP cut Spain
+        # can have triggered.
+        rows = [
+            i for i, basket in enumerate(self.basket)
+            if basket is not None and country in basket
+            and (not cuts_only or self.price_after[i] < self.price_before[i])
+        ]
+        return self.to_frame().iloc[rows].reset_index(drop=True)
+
+    def rationale(self, price_of):
+        # {(drug, country, month): text}; price_of(drug, country, month)
+        # returns the simulated price or None. Later entries for the same cell
+        # win, so an IRP event overrides an intervention in the same month.
+        texts = {}
+        for i, kind in enumerate(self.type):
+            drug, month = self.drug[i], self.month[i]
+            if kind == "irp":
+                collected_at = self.collected_at[i]
+                members = ", ".join(f"{c}: {format_price(price_of(drug, c, collected_at))}" for c in self.basket[i])
+                text = f"IRP Event: Rule={self.rule[i]}, Basket={members}"
+            else:
+                percent = self.mode[i] == "percent"
+                text = f"Intervention: {'-' if percent else ''}{self.value[i]} {'%' if percent else '€'}"
+            texts[(drug, self.country[i], month)] = text
+        return texts
+
+
+def with_rationale(result_df, event_log):
+    # Adds the Rationale column to a result simulated with rationale=False,
+    # using the EventLog recorded by the same run.
+    month_map = event_log.month_map
+    index = pd.MultiIndex.from_arrays([
+        result_df["Drug"].astype(object),
+        result_df["Country"].astype(object),
+        result_df["Year"].astype(np.int64),
+        result_df["Month"].astype(np.int64),
+    ])
+    prices = result_df["Price"].to_numpy(float)
+
+    needed = set()
+    for i, kind in enumerate(event_log.type):
+        if kind == "irp":
+            collected = month_map[event_log.collected_at[i]]
+            needed.update((event_log.drug[i], c, *collected) for c in event_log.basket[i])
+    needed = list(needed)
+    positions = index.get_indexer(needed) if needed else []
+    lookup = {key: prices[pos] for key, pos in zip(needed, positions) if pos >= 0}
+
+    def price_of(drug, country, month):
+        return lookup.get((drug, country, *month_map[month]))
+
+    texts = event_log.rationale(price_of)
+    rationale = np.full(len(result_df), "Carry-forward", dtype=object)
+    if texts:
+        keys = [(drug, country, *month_map[m]) for drug, country, m in texts]
+        for pos, text in zip(index.get_indexer(keys), texts.values()):
+            if pos >= 0:
+                rationale[pos] = text
+    return result_df.assign(Rationale=rationale)
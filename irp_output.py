@@ -0,0 +1,132 @@
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+RESULT_COLUMNS = ["Drug", "Country", "Year", "Month", "Price", "Volume", "Revenue", "Rationale"]
+
+
+def assemble_result_frame(drug_names, drug_codes, country_names, country_codes, month_map, prices, volumes, rationale=None):
+    # Builds the result frame column by column. Row i of `prices` and
+    # `volumes` (series x months) is the series of drug_names[drug_codes[i]]
+    # in country_names[country_codes[i]]; `rationale` maps (series, month) to
+    # the text for that cell, everything else is carry-forward. With
+    # rationale=None the Rationale column is left out.
+    series, months = prices.shape
+    years_axis = np.array([year for year, _ in month_map], dtype=np.int16)
+    months_axis = np.array([month for _, month in month_map], dtype=np.int16)
+
+    if volumes.dtype.kind == "f" and not np.any(np.mod(volumes, 1)):
+        volumes = volumes.astype(np.int64)
+    price_column = prices.ravel()
+    volume_column = volumes.ravel()
+
+    columns = {
+        "Drug": pd.Categorical.from_codes(np.repeat(drug_codes, months), categories=drug_names),
+        "Country": pd.Categorical.from_codes(np.repeat(country_codes, months), categories=country_names),
+        "Year": np.tile(years_axis, series),
+        "Month": np.tile(months_axis, series),
+        "Price": price_column,
+        "Volume": volume_column,
+        "Revenue": np.round(price_column * volume_column, 2),
+    }
+    if rationale is not None:
+        rationale_column = np.full(series * months, "Carry-forward", dtype=object)
+        for (row, m), text in rationale.items():
+            rationale_column[row * months + m] = text
+        columns["Rationale"] = rationale_column
+    return pd.DataFrame(columns, columns=[c for c in RESULT_COLUMNS if c in columns])
+
+
+KEY_COLUMNS = ["Drug", "Country", "Year", "Month"]
+
+# Scenario against baseline revenue, summed over drugs: `country` is indexed
+# by Country and also flags Impacted countries, `country_year` by (Country,
+# Year) and `country_month` by (Country, Date). Each holds Revenue_Baseline,
+# Revenue_Scenario and Revenue_Diff (baseline minus scenario). `dates` are
+# the month starts of the simulated months.
+ComparisonCube = namedtuple("ComparisonCube", ["country", "country_year", "country_month", "dates"])
+
+
+def month_dates(years, months):
+    # Month-start dates of (year, month) arrays, without parsing strings
+    years = np.asarray(years, dtype=np.int64)
+    months = np.asarray(months, dtype=np.int64)
+    return pd.DatetimeIndex(((years - 1970) * 12 + months - 1).astype("datetime64[M]").astype("datetime64[ns]"))
+
+
+def _same_values(a, b):
+    # Compares categoricals on their codes rather than their labels
+    if isinstance(a.dtype, pd.CategoricalDtype) and isinstance(b.dtype, pd.CategoricalDtype):
+        if a.cat.categories.equals(b.cat.categories):
+            return np.array_equal(a.cat.codes.to_numpy(), b.cat.codes.to_numpy())
+    return np.array_equal(a.to_numpy(), b.to_numpy())
+
+
+def align_results(baseline_df, scenario_df):
+    # (baseline rows, scenario rows) pairing the rows of two results on
+    # Drug, Country, Year and Month. Results of the same inputs share their
+    # layout and pair up row by row without a merge.
+    if len(baseline_df) == len(scenario_df) and all(
+        _same_values(baseline_df[k], scenario_df[k]) for k in KEY_COLUMNS
+    ):
+        rows = np.arange(len(baseline_df))
+        return rows, rows
+    pairs = pd.merge(
+        baseline_df[KEY_COLUMNS].astype({"Drug": object, "Country": object}).assign(_baseline=np.arange(len(baseline_df))),
+        scenario_df[KEY_COLUMNS].astype({"Drug": object, "Country": object}).assign(_scenario=np.arange(len(scenario_df))),
+        on=KEY_COLUMNS
+    )
+    return pairs["_baseline"].to_numpy(), pairs["_scenario"].to_numpy()
+
+
+def _totals(index, baseline, scenario):
+    frame = pd.DataFrame({"Revenue_Baseline": baseline, "Revenue_Scenario": scenario}, index=index)
+    frame["Revenue_Diff"] = frame["Revenue_Baseline"] - frame["Revenue_Scenario"]
+    return frame.sort_index()
+
+
+def comparison_cube(baseline_df, scenario_df):
+    # Country, country-year and country-month revenue totals of a scenario
+    # and its baseline, summed with one bincount per level on the aligned
+    # revenue columns.
+    baseline_rows, scenario_rows = align_results(baseline_df, scenario_df)
+    country_codes, countries = pd.factorize(baseline_df["Country"].take(baseline_rows), sort=True)
+    years = baseline_df["Year"].to_numpy(np.int64)[baseline_rows]
+    month_codes, month_keys = pd.factorize(years * 12 + baseline_df["Month"].to_numpy(np.int64)[baseline_rows] - 1, sort=True)
+    year_codes, year_keys = pd.factorize(years, sort=True)
+    revenue = [
+        np.nan_to_num(baseline_df["Revenue"].to_numpy(float)[baseline_rows]),
+        np.nan_to_num(scenario_df["Revenue"].to_numpy(float)[scenario_rows]),
+    ]
+    countries = pd.Index(list(countries), name="Country")
+    dates = month_dates(month_keys // 12, month_keys % 12 + 1)
+
+    def totals(codes, size):
+        cells = country_codes * size + codes
+        return [np.bincount(cells, weights=r, minlength=len(countries) * size) for r in revenue]
+
+    country = _totals(countries, *[np.bincount(country_codes, weights=r, minlength=len(countries)) for r in revenue])
+    country["Impacted"] = country["Revenue_Scenario"] < country["Revenue_Baseline"]
+    country_year = _totals(
+        pd.MultiIndex.from_product([countries, pd.Index(year_keys, name="Year")]), *totals(year_codes, len(year_keys))
+    )
+    country_month = _totals(
+        pd.MultiIndex.from_product([countries, pd.Index(dates, name="Date")]), *totals(month_codes, len(month_keys))
+    )
+    country_month.insert(0, "Month", np.tile(month_keys % 12 + 1, len(countries)))
+    country_month.insert(0, "Year", np.tile(month_keys // 12, len(countries)))
+    return ComparisonCube(country, country_year, country_month, dates)
+
+
+def comparison_frame(baseline_df, scenario_df):
+    # Row-level comparison for tables and exports: the key columns, then
+    # every other column of the scenario and of the baseline with _Scenario
+    # and _Baseline suffixes, and Revenue_Diff.
+    baseline_rows, scenario_rows = align_results(baseline_df, scenario_df)
+    frame = scenario_df[KEY_COLUMNS].iloc[scenario_rows].reset_index(drop=True)
+    for suffix, source, rows in (("_Scenario", scenario_df, scenario_rows), ("_Baseline", baseline_df, baseline_rows)):
+        for column in source.columns:
+            if column not in KEY_COLUMNS:
+                frame[column + suffix] = source[column].to_numpy()[rows]
+    frame["Revenue_Diff"] = frame["Revenue_Baseline"] - frame["Revenue_Scenario"]
+    return frame
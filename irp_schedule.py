@@ -0,0 +1,223 @@
+from collections import namedtuple
+
+RULES = ("min", "average", "median")
+
+# One scheduled IRP review: prices collected at `collected_at` are enforced at
+# `month`. `order` is the policy's position in irp_policies. `level` is the
+# review's place in the month: reviews of one level read prices after every
+# lower level has written and before any review of the same level writes, see
+# reference_levels. `country_id` and `basket_index` hold country indices when
+# a country index was given, otherwise None.
+IRPEvent = namedtuple(
+    "IRPEvent",
+    [
+        "month", "order", "level", "country", "country_id", "rule", "basket", "basket_index",
+        "collected_at", "allow_increase"
+    ]
+)
+
+
+def build_month_map(years, start_year):
+    # (year, month) of every simulated month: month index m falls m months
+    # after January start_year, through month years * 12
+    return [(start_year + (m // 12), (m % 12) + 1) for m in range(years * 12 + 1)]
+
+
+def review_anchor(policy, month_map):
+    # First collection month: the first simulated month falling on the
+    # policy's review_month, or month 0 when no review month is set.
+    review_month = policy.get("review_month")
+    if review_month is None:
+        return 0
+    for m, (_, month) in enumerate(month_map):
+        if month == review_month:
+            return m
+    return None
+
+
+def _reviews(policy):
+    return bool(policy.get("performs_irp", True) and policy.get("basket") and policy.get("rule", "average") in RULES)
+
+
+def reference_levels(irp_policies):
+    # {country: level} for every reviewing country. A basket member that is
+    # itself reviewed gets a lower level than the countries referencing it,
+    # so same-month reviews see its new price. Countries referencing each
+    # other, directly or in a cycle (a strongly connected component of the
+    # reference graph), share a level and see each other's price from
+    # before the month's writes. The result does not depend on dict order.
+    reviewing = sorted(country for country, policy in irp_policies.items() if _reviews(policy))
+    members = {
+        country: sorted({m for m in irp_policies[country]["basket"] if m in irp_policies and m != country and _reviews(irp_policies[m])})
+        for country in reviewing
+    }
+
+    # Tarjan's algorithm, iterative; components come out members-first
+    index, low, on_stack, stack, components = {}, {}, set(), [], []
+    for root in reviewing:
+        if root in index:
+            continue
+        work = [(root, 0)]
+        while work:
+            node, i = work.pop()
+            if i == 0:
+                index[node] = low[node] = len(index)
+                stack.append(node)
+                on_stack.add(node)
+            if i < len(members[node]):
+                work.append((node, i + 1))
+                member = members[node][i]
+                if member not in index:
+                    work.append((member, 0))
+                elif member in on_stack:
+                    low[node] = min(low[node], index[member])
+                continue
+            if low[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+
+    levels = {}
+    for component in components:
+        level = max(
+            (levels[m] + 1 for country in component for m in members[country] if m in levels),
+            default=0
+        )
+        for country in component:
+            levels[country] = level
+    return levels
+
+
+def compile_irp_schedule(irp_policies, month_map, country_index=None):
+    # Reviews sorted by month, level and country name
+    total_months = len(month_map) - 1
+    levels = reference_levels(irp_policies)
+    schedule = []
+    for order, (country, policy) in enumerate(irp_policies.items()):
+        basket = policy.get("basket", [])
+        rule = policy.get("rule", "average")
+        if not _reviews(policy):
+            continue
+        country_id = basket_index = None
+        if country_index is not None:
+            if country not in country_index:
+                continue
+            country_id = country_index[country]
+            basket_index = [country_index[c] for c in basket if c in country_index]
+            if not basket_index:
+                continue
+        freq = policy.get("frequency", 12)
+        delay = policy.get("enforcement_delay", 0)
+        allow_increase = policy.get("allow_increase", False)
+        anchor = review_anchor(policy, month_map)
+        if anchor is None or freq <= 0:
+            continue
+        collected_at = anchor
+        while collected_at + delay <= total_months:
+            if collected_at + delay >= 1:
+                schedule.append(IRPEvent(
+                    collected_at + delay,
+                    order,
+                    levels[country],
+                    country,
+                    country_id,
+                    rule,
+                    tuple(basket),
+                    basket_index,
+                    collected_at,
+                    allow_increase
+                ))
+            collected_at += freq
+    schedule.sort(key=lambda e: (e.month, e.level, e.country))
+    return schedule
+
+
+def group_by_level(due):
+    # Splits one month's reviews, sorted as compiled, into lists per level
+    levels = []
+    for event in due:
+        if not levels or levels[-1][0].level != event.level:
+            levels.append([])
+        levels[-1].append(event)
+    return levels
+
+
+def group_by_month(schedule):
+    events_by_month = {}
+    for event in schedule:
+        events_by_month.setdefault(event.month, []).append(event)
+    return events_by_month
+
+
+def dependent_countries(schedule, sources):
+    # Country indices whose prices can follow a change in `sources`: the
+    # sources themselves plus every country that has one of them in its
+    # basket, directly or through other baskets. Needs an indexed schedule.
+    referenced_by = {}
+    for event in schedule:
+        for member in event.basket_index:
+            referenced_by.setdefault(member, set()).add(event.country_id)
+    affected = set(sources)
+    pending = list(sources)
+    while pending:
+        for country_id in referenced_by.get(pending.pop(), ()):
+            if country_id not in affected:
+                affected.add(country_id)
+                pending.append(country_id)
+    return affected
+
+
+def referenced_countries(schedule, targets):
+    # Country indices whose prices can reach `targets`: the targets
+    # themselves plus every basket member of their reviews, directly or
+    # through other baskets. Needs an indexed schedule.
+    members = {}
+    for event in schedule:
+        members.setdefault(event.country_id, set()).update(event.basket_index)
+    reached = set(targets)
+    pending = list(targets)
+    while pending:
+        for country_id in members.get(pending.pop(), ()):
+            if country_id not in reached:
+                reached.add(country_id)
+                pending.append(country_id)
+    return reached
+
+
+class SteadyState:
+    # Detects when a simulation can no longer change. Prices that stayed
+    # constant since `last_change` only feed reviews the same inputs again, so
+    # once every country with reviews still to come has been reviewed without
+    # a change on prices collected at or after `last_change`, and no
+    # intervention is pending, the remaining months are pure carry-forward.
+    # Call changed() for every write that alters a price, reviewed() for every
+    # evaluated review and settled(m) once month m is complete.
+
+    def __init__(self, schedule, last_intervention=-1):
+        self.final_review = {}
+        for event in schedule:
+            self.final_review[event.order] = event.month
+        self.last_intervention = last_intervention
+        self.last_change = 0
+        self.verified = set()
+
+    def changed(self, month):
+        self.last_change = month
+        self.verified.clear()
+
+    def reviewed(self, event):
+        if event.month > self.last_change and event.collected_at >= self.last_change:
+            self.verified.add(event.order)
+
+    def settled(self, month):
+        if month < self.last_intervention:
+            return False
+        return all(order in self.verified for order, last in self.final_review.items() if last > month)
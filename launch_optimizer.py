@@ -0,0 +1,329 @@
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from interventions import Intervention
+from irp_schedule import dependent_countries, referenced_countries
+from vectorized_simulator import prepare_simulation, run_months, volume_cube
+from worker_pool import WorkerPool, chunked, rows_per_chunk
+
+# Search range around a country's initial price when no price bounds are given
+DEFAULT_PRICE_RANGE = 0.3
+# Candidate rows a round needs before it is spread over worker processes
+PARALLEL_MIN_ROWS = 2048
+# Candidate price rows (candidates x countries x months) held per chunk.
+CHUNK_BYTES = 64 * 1024 * 1024
+
+# plan has one row per country priced for the drug: launch year, month and
+# price, the price corridor and ten-year revenue under the recommended plan
+# and under the starting plan. revenue and start_revenue are the drug's
+# totals, rounds the coordinate rounds run and evaluations the candidate
+# rows simulated; memo_hits counts candidates answered from the memo.
+CorridorResult = namedtuple(
+    "CorridorResult", ["plan", "revenue", "start_revenue", "rounds", "evaluations", "memo_hits"]
+)
+
+def _country_revenue(prices, volumes):
+    # (..., countries, months) -> revenue per country
+    return np.round(np.nan_to_num(prices) * volumes, 2).sum(axis=-1)
+
+
+def _launch(interventions_by_month, setup, d, row, c, month, price):
+    event = Intervention(month, setup.drugs[d], setup.registry.names[c], "absolute", price)
+    interventions_by_month.setdefault(month, []).append((row, event))
+
+
+def _simulate_plans(setup, d, plans):
+    # Final prices (plans x countries x months) of drug row d under each
+    # (launch prices, launch months) plan. A country has no price, and so no
+    # revenue and no weight in baskets, before its launch month.
+    prices = np.repeat(setup.initial[d:d + 1], len(plans), axis=0)
+    interventions_by_month = {}
+    for row, (plan_prices, launches) in enumerate(plans):
+        prices[row, :, 0] = np.where(launches == 0, plan_prices, np.nan)
+        for c in np.flatnonzero(launches > 0):
+            _launch(interventions_by_month, setup, d, row, c, int(launches[c]), float(plan_prices[c]))
+    run_months(setup, prices, None, [d] * len(plans), interventions_by_month)
+    return prices
+
+
+def _evaluate_chunk(state, chunk):
+    # chunk: (incumbent prices, plan prices, plan launches, [(country,
+    # [(price, launch)])]). Every candidate moves one country away from the
+    # incumbent plan; only the countries it can reach are re-simulated, from
+    # the first month any candidate differs. Returns each candidate's revenue
+    # over the countries its country reaches, in task order.
+    setup, d, volumes, downstream = state["setup"], state["d"], state["volumes"], state["downstream"]
+    incumbent, plan_prices, launches, tasks = chunk
+    rows = [(c, price, month) for c, candidates in tasks for price, month in candidates]
+    columns = set()
+    for c, _ in tasks:
+        columns.update(downstream[c].tolist())
+    first_month = min(min(launches[c], month) for c, _, month in rows)
+    relaunched = [c for c in sorted(columns) if launches[c] >= max(first_month, 1) and not np.isnan(plan_prices[c])]
+
+    prices = np.repeat(incumbent[None], len(rows), axis=0)
+    interventions_by_month = {}
+    for row, (varied, price, month) in enumerate(rows):
+        prices[row, varied, 0] = price if month == 0 else np.nan
+        for c in relaunched:
+            if c != varied:
+                _launch(interventions_by_month, setup, d, row, c, int(launches[c]), float(plan_prices[c]))
+        if month > 0:
+            _launch(interventions_by_month, setup, d, row, varied, month, price)
+    run_months(setup, prices, None, [d] * len(rows), interventions_by_month, first_month, columns)
+    revenue = _country_revenue(prices, volumes)
+    return [float(revenue[row, downstream[c]].sum()) for row, (c, _, _) in enumerate(rows)]
+
+
+def _price_grid(low, high, center, steps, level):
+    # Level 0 spans the bounds; each later level halves the spacing around
+    # the current price.
+    if high <= low:
+        return [round(low, 2)]
+    if level == 0:
+        grid = np.linspace(low, high, steps)
+    else:
+        span = (high - low) / (steps - 1) / 2 ** (level - 1)
+        grid = np.linspace(max(low, center - span), min(high, center + span), steps)
+    return sorted(set(np.round(grid, 2).tolist()) | {center})
+
+
+def _launch_grid(first, last, step, current):
+    return sorted(set(range(first, last + 1, step)) | {last, current})
+
+
+def _month_index(setup, year_month, country):
+    for m, ym in enumerate(setup.month_map):
+        if ym == tuple(year_month):
+            return m
+    first, last = setup.month_map[0], setup.month_map[-1]
+    raise ValueError(
+        f"Launch window of {country!r} is outside the simulated horizon "
+        f"{first[0]}-{first[1]} to {last[0]}-{last[1]}"
+    )
+
+
+def _split_tasks(tasks, limit):
+    # (country, candidates) tasks with at most `limit` candidates each
+    for c, candidates in tasks:
+        for start in range(0, len(candidates), limit):
+            yield c, candidates[start:start + limit]
+
+
+def optimize_launch_corridor(
+    initial_prices,
+    volumes,
+    irp_policies,
+    drug,
+    price_bounds=None,
+    launch_windows=None,
+    years=10,
+    start_year=2025,
+    price_steps=5,
+    launch_step=3,
+    refinements=2,
+    corridor_steps=21,
+    tolerance=0.01,
+    max_rounds=10,
+    processes=None
+):
+    # Searches launch prices and launch months per country that maximise the
+    # drug's revenue over the horizon under the IRP policies.
+    #
+    # price_bounds maps a country to its (low, high) launch price; without
+    # it every country priced for the drug is searched within
+    # DEFAULT_PRICE_RANGE of its initial price, with it only the listed
+    # countries are and the rest keep their initial price. launch_windows
+    # maps a country to its earliest and latest (year, month) launch; other
+    # countries launch in the first month.
+    #
+    # The search is coordinate ascent. Every round moves each searched
+    # country through a grid of prices and launch months (every launch_step
+    # months) with the other countries fixed, re-simulating only the
+    # countries it reaches through the baskets; candidates run as rows of one
+    # vectorised month loop, across processes for large rounds. Results are
+    # memoised on the plan of every country that can influence them, so a
+    # country is not re-evaluated until its neighbourhood changes. The
+    # improving moves are then combined, best first, keeping whichever
+    # prefix simulates best. Each of the `refinements` later levels halves
+    # the price spacing around the current prices. Finally each price is
+    # scanned over its bounds in corridor_steps steps: the corridor is the
+    # range around the recommended price whose total revenue stays within
+    # `tolerance` of the plan's.
+    if price_steps < 2 or corridor_steps < 2:
+        raise ValueError("price_steps and corridor_steps must be at least 2")
+    if launch_step < 1:
+        raise ValueError("launch_step must be at least 1")
+    setup = prepare_simulation(initial_prices, irp_policies, None, years, start_year)
+    if drug not in setup.drug_index:
+        raise ValueError(f"Unknown drug {drug!r}")
+    d = setup.drug_index[drug]
+    registry = setup.registry
+    initial = setup.initial[d, :, 0]
+    priced = np.flatnonzero(~np.isnan(initial))
+    priced_set = set(priced.tolist())
+
+    if price_bounds is None:
+        price_bounds = {
+            registry.names[c]: (initial[c] * (1 - DEFAULT_PRICE_RANGE), initial[c] * (1 + DEFAULT_PRICE_RANGE))
+            for c in priced
+        }
+    low, high = initial.copy(), initial.copy()
+    first, last = np.zeros(len(registry), dtype=np.int64), np.zeros(len(registry), dtype=np.int64)
+    errors = []
+    for country, bounds in price_bounds.items():
+        c = registry.resolve(country)
+        if c is None or c not in priced_set:
+            errors.append(f"{country!r} has no price for {drug!r}")
+        elif not 0 <= bounds[0] <= bounds[1]:
+            errors.append(f"Price bounds of {country!r} must satisfy 0 <= low <= high, got {tuple(bounds)}")
+        else:
+            low[c], high[c] = round(bounds[0], 2), round(bounds[1], 2)
+    for country, (earliest, latest) in (launch_windows or {}).items():
+        c = registry.resolve(country)
+        if c is None or c not in priced_set:
+            errors.append(f"{country!r} has no price for {drug!r}")
+            continue
+        try:
+            first[c], last[c] = _month_index(setup, earliest, country), _month_index(setup, latest, country)
+        except ValueError as error:
+            errors.append(str(error))
+            continue
+        if first[c] > last[c]:
+            errors.append(f"Launch window of {country!r} ends before it starts")
+    if errors:
+        raise ValueError("Invalid launch search:\n" + "\n".join(errors))
+
+    searched = [c for c in priced.tolist() if high[c] > low[c] or last[c] > first[c]]
+    downstream = {c: np.array(sorted(dependent_countries(setup.schedule, {c})), dtype=np.int64) for c in searched}
+    context = {
+        c: np.array(sorted((referenced_countries(setup.schedule, downstream[c].tolist()) & priced_set) - {c}), dtype=np.int64)
+        for c in searched
+    }
+    volumes = volume_cube(setup, {drug: volumes.get(drug, {})})[d]
+
+    plan_prices = np.where(np.isnan(initial), np.nan, np.round(np.clip(initial, low, high), 2))
+    launches = first.copy()
+    incumbent = _simulate_plans(setup, d, [(plan_prices, launches)])[0]
+    start_country_revenue = _country_revenue(incumbent, volumes)
+    start_revenue = float(start_country_revenue.sum())
+
+    memo = {}
+    counters = {"rounds": 0, "evaluations": 0, "memo_hits": 0}
+    pool = WorkerPool(
+        {"setup": setup, "d": d, "volumes": volumes, "downstream": downstream}, processes, min_items=PARALLEL_MIN_ROWS
+    )
+
+    def evaluate(candidates_by_country):
+        # {country: [(price, launch)]} -> {country: [total revenue]} against
+        # the incumbent plan
+        country_revenue = _country_revenue(incumbent, volumes)
+        total = float(country_revenue.sum())
+        totals, keys, tasks = {}, {}, []
+        for c, candidates in candidates_by_country.items():
+            state = tuple(zip(plan_prices[context[c]].tolist(), launches[context[c]].tolist()))
+            keys[c] = [(c, price, month, state) for price, month in candidates]
+            missing = [
+                (price, month) for (price, month), key in zip(candidates, keys[c])
+                if key not in memo and (price, month) != (plan_prices[c], launches[c])
+            ]
+            counters["memo_hits"] += len(candidates) - len(missing)
+            if missing:
+                tasks.append((c, missing))
+
+        rows = sum(len(candidates) for _, candidates in tasks)
+        counters["evaluations"] += rows
+        if tasks:
+            limit = rows_per_chunk(rows, incumbent.nbytes, pool.workers if pool.parallel(rows) else 1, CHUNK_BYTES)
+            chunks = [
+                (incumbent, plan_prices, launches, chunk_tasks)
+                for chunk_tasks in chunked(_split_tasks(tasks, limit), limit, lambda task: len(task[1]))
+            ]
+            results = pool.map(_evaluate_chunk, chunks, rows)
+            for (_, _, _, chunk_tasks), revenue in zip(chunks, results):
+                revenue = iter(revenue)
+                for c, candidates in chunk_tasks:
+                    state = keys[c][0][3]
+                    for price, month in candidates:
+                        memo[(c, price, month, state)] = next(revenue)
+
+        for c, candidates in candidates_by_country.items():
+            reached = float(country_revenue[downstream[c]].sum())
+            totals[c] = [
+                total if (price, month) == (plan_prices[c], launches[c]) else total - reached + memo[key]
+                for (price, month), key in zip(candidates, keys[c])
+            ]
+        return totals
+
+    with pool:
+        for level in range(refinements + 1):
+            for _ in range(max_rounds):
+                counters["rounds"] += 1
+                total = float(_country_revenue(incumbent, volumes).sum())
+                candidates_by_country = {
+                    c: [
+                        (price, month)
+                        for price in _price_grid(low[c], high[c], float(plan_prices[c]), price_steps, level)
+                        for month in _launch_grid(int(first[c]), int(last[c]), launch_step, int(launches[c]))
+                    ]
+                    for c in searched
+                }
+                totals = evaluate(candidates_by_country)
+                moves = []
+                for c, candidates in candidates_by_country.items():
+                    best = int(np.argmax(totals[c]))
+                    if totals[c][best] > total:
+                        moves.append((totals[c][best] - total, registry.names[c], c, candidates[best]))
+                if not moves:
+                    break
+
+                # The best single move is exact; larger prefixes interact
+                # through shared baskets and are kept only if they simulate
+                # better.
+                moves.sort(key=lambda move: (-move[0], move[1]))
+                sizes = sorted({min(2 ** i, len(moves)) for i in range(len(moves).bit_length() + 1)})
+                plans = []
+                for size in sizes:
+                    prices, months = plan_prices.copy(), launches.copy()
+                    for _, _, c, (price, month) in moves[:size]:
+                        prices[c], months[c] = price, month
+                    plans.append((prices, months))
+                simulated = _simulate_plans(setup, d, plans)
+                best = int(np.argmax(_country_revenue(simulated, volumes).sum(axis=-1)))
+                plan_prices, launches = plans[best]
+                incumbent = simulated[best]
+
+        corridor_low, corridor_high = plan_prices.copy(), plan_prices.copy()
+        scanned = [c for c in searched if high[c] > low[c]]
+        grids = {
+            c: sorted(set(np.round(np.linspace(low[c], high[c], corridor_steps), 2).tolist()) | {float(plan_prices[c])})
+            for c in scanned
+        }
+        totals = evaluate({c: [(price, int(launches[c])) for price in grids[c]] for c in scanned})
+
+    country_revenue = _country_revenue(incumbent, volumes)
+    floor = float(country_revenue.sum()) * (1 - tolerance)
+    for c in scanned:
+        grid, scan = grids[c], totals[c]
+        i = j = grid.index(float(plan_prices[c]))
+        while i > 0 and scan[i - 1] >= floor:
+            i -= 1
+        while j < len(grid) - 1 and scan[j + 1] >= floor:
+            j += 1
+        corridor_low[c], corridor_high[c] = grid[i], grid[j]
+
+    order = sorted(priced.tolist(), key=lambda c: (launches[c], registry.names[c]))
+    plan = pd.DataFrame({
+        "Country": [registry.names[c] for c in order],
+        "Launch_Year": [setup.month_map[launches[c]][0] for c in order],
+        "Launch_Month": [setup.month_map[launches[c]][1] for c in order],
+        "Launch_Price": plan_prices[order],
+        "Corridor_Low": corridor_low[order],
+        "Corridor_High": corridor_high[order],
+        "Revenue": country_revenue[order],
+        "Revenue_Start": start_country_revenue[order],
+    })
+    return CorridorResult(
+        plan, float(country_revenue.sum()), start_revenue,
+        counters["rounds"], counters["evaluations"], counters["memo_hits"]
+    )
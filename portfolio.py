@@ -0,0 +1,178 @@
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from irp_schedule import build_month_map
+from result_cache import input_key
+from simulator import run_irp_simulation_with_interventions
+from worker_pool import WorkerPool
+
+# Drugs a portfolio needs before it is spread over worker processes
+PARALLEL_MIN_DRUGS = 8
+# Drugs simulated together in one task. The NumPy engine advances all drugs
+# of a task in one month loop; smaller tasks stream results sooner.
+MAX_DRUGS_PER_TASK = 16
+
+# Totals of one simulated drug: revenue and revenue at launch prices held
+# flat (no IRP) per country and per month, plus the result frame when
+# frames are kept.
+DrugTotals = namedtuple("DrugTotals", ["drug", "countries", "revenue", "flat_revenue", "monthly", "flat_monthly", "frame"])
+
+# summary: one row per drug, by_country and by_month the portfolio totals;
+# exposure is the revenue IRP and interventions take off flat launch
+# prices. frames maps each drug to its result frame when kept, else None.
+PortfolioResult = namedtuple("PortfolioResult", ["summary", "by_country", "by_month", "frames"])
+
+
+def drug_policies(irp_policies, overrides=None):
+    # irp_policies with one drug's overrides: {country: {field: value}}
+    # entries update the country's policy field by field; countries missing
+    # from irp_policies take the override as their full policy.
+    if not overrides:
+        return irp_policies
+    policies = dict(irp_policies)
+    for country, override in overrides.items():
+        policies[country] = dict(policies.get(country, {}), **override)
+    return policies
+
+
+def _drug_totals(drug, frame, months, keep_frame):
+    # Frames hold each series' months contiguously and in order, so the
+    # launch price of a row is the price at the start of its block.
+    countries = frame["Country"].to_numpy()[::months]
+    volumes = frame["Volume"].to_numpy(dtype=float).reshape(-1, months)
+    revenue = frame["Revenue"].to_numpy(dtype=float).reshape(-1, months)
+    launch = frame["Price"].to_numpy(dtype=float)[::months]
+    flat = np.round(np.nan_to_num(launch)[:, None] * volumes, 2)
+    revenue = np.nan_to_num(revenue)
+    return DrugTotals(
+        drug, list(countries), revenue.sum(axis=1), flat.sum(axis=1), revenue.sum(axis=0), flat.sum(axis=0),
+        frame if keep_frame else None
+    )
+
+
+def _simulate_task(_, task):
+    # task: (drugs, initial_prices, volumes, irp_policies, interventions,
+    # horizon, engine, keep_frames) for drugs sharing their policies. Tasks
+    # carry all their inputs, so the pool holds no state.
+    drugs, initial_prices, volumes, irp_policies, interventions, horizon, engine, keep_frames = task
+    frame = run_irp_simulation_with_interventions(
+        initial_prices,
+        volumes,
+        irp_policies,
+        interventions=interventions,
+        **horizon,
+        engine=engine,
+        rationale=False
+    )
+    months = horizon["years"] * 12 + 1
+    frame["Drug"] = frame["Drug"].astype(object)
+    return [
+        _drug_totals(drug, part.reset_index(drop=True), months, keep_frames)
+        for drug, part in frame.groupby("Drug", sort=False)
+    ]
+
+
+def portfolio_tasks(portfolio, irp_policies, interventions=None, horizon=None, engine="numpy", keep_frames=False, drugs_per_task=MAX_DRUGS_PER_TASK):
+    # Splits a portfolio into simulation tasks. Drugs with the same
+    # effective policies share tasks of at most drugs_per_task drugs;
+    # interventions go with their drug.
+    horizon = horizon or {"years": 10, "start_year": 2025}
+    by_drug = {}
+    for event in interventions or []:
+        if event.get("drug") not in portfolio:
+            raise ValueError(f"Intervention for unknown drug {event.get('drug')!r}")
+        by_drug.setdefault(event["drug"], []).append(event)
+
+    groups = {}
+    for drug, inputs in portfolio.items():
+        policies = drug_policies(irp_policies, inputs.get("policies"))
+        groups.setdefault(input_key(policies), (policies, []))[1].append(drug)
+
+    tasks = []
+    for policies, drugs in groups.values():
+        for start in range(0, len(drugs), drugs_per_task):
+            part = drugs[start:start + drugs_per_task]
+            tasks.append((
+                part,
+                {drug: portfolio[drug]["prices"] for drug in part},
+                {drug: portfolio[drug].get("volumes", {}) for drug in part},
+                policies,
+                [event for drug in part for event in by_drug.get(drug, [])],
+                horizon,
+                engine,
+                keep_frames
+            ))
+    return tasks
+
+
+def run_portfolio(
+    portfolio,
+    irp_policies,
+    interventions=None,
+    years=10,
+    start_year=2025,
+    engine="numpy",
+    processes=None,
+    keep_frames=False,
+    on_drug=None
+):
+    # Simulates many drugs, each with its own prices, volumes and optional
+    # policy overrides: portfolio maps a drug to {"prices": {country: price},
+    # "volumes": {country: {month: volume}}, "policies": {country:
+    # override}}. Drugs never interact, so they run in parallel processes;
+    # each finished drug is folded into the portfolio totals straight away
+    # and passed to on_drug(DrugTotals, done, total) when given. Errors in
+    # the inputs raise ValueError as for a single run.
+    horizon = {"years": years, "start_year": start_year}
+    pool = WorkerPool(processes=processes, min_items=PARALLEL_MIN_DRUGS)
+    workers = pool.workers if pool.parallel(len(portfolio)) else 1
+    drugs_per_task = max(1, min(MAX_DRUGS_PER_TASK, -(-len(portfolio) // workers)))
+    tasks = portfolio_tasks(portfolio, irp_policies, interventions, horizon, engine, keep_frames, drugs_per_task)
+
+    months = years * 12 + 1
+    summary = []
+    country_revenue, country_flat, country_drugs = {}, {}, {}
+    monthly, flat_monthly = np.zeros(months), np.zeros(months)
+    frames = {} if keep_frames else None
+
+    def fold(totals):
+        summary.append((totals.drug, totals.revenue.sum(), totals.flat_revenue.sum()))
+        for country, revenue, flat in zip(totals.countries, totals.revenue, totals.flat_revenue):
+            country_revenue[country] = country_revenue.get(country, 0.0) + revenue
+            country_flat[country] = country_flat.get(country, 0.0) + flat
+            country_drugs[country] = country_drugs.get(country, 0) + 1
+        monthly[:] += totals.monthly
+        flat_monthly[:] += totals.flat_monthly
+        if keep_frames:
+            frames[totals.drug] = totals.frame
+        if on_drug is not None:
+            on_drug(totals, len(summary), len(portfolio))
+
+    with pool:
+        for drug_totals in pool.completed(_simulate_task, tasks, len(portfolio)):
+            for totals in drug_totals:
+                fold(totals)
+
+    summary = pd.DataFrame(summary, columns=["Drug", "Revenue", "Revenue_No_IRP"])
+    by_country = pd.DataFrame({
+        "Country": list(country_revenue),
+        "Drugs": list(country_drugs.values()),
+        "Revenue": list(country_revenue.values()),
+        "Revenue_No_IRP": list(country_flat.values()),
+    })
+    month_map = build_month_map(years, start_year)
+    by_month = pd.DataFrame({
+        "Year": [year for year, _ in month_map],
+        "Month": [month for _, month in month_map],
+        "Revenue": monthly,
+        "Revenue_No_IRP": flat_monthly,
+    })
+    for frame in (summary, by_country, by_month):
+        frame["Exposure"] = frame["Revenue_No_IRP"] - frame["Revenue"]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            frame["Exposure_Pct"] = np.where(
+                frame["Revenue_No_IRP"] > 0, 100 * frame["Exposure"] / frame["Revenue_No_IRP"], 0.0
+            )
+    summary = summary.sort_values(["Exposure", "Drug"], ascending=[False, True], ignore_index=True)
+    by_country = by_country.sort_values(["Exposure", "Country"], ascending=[False, True], ignore_index=True)
+    return PortfolioResult(summary, by_country, by_month, frames)
@@ -0,0 +1,131 @@
+from bisect import bisect_right
+import numpy as np
+import pandas as pd
+
+STEP_DAYS = {"week": 7, "day": 1}
+
+
+class ChangePointSeries:
+    # A price series stored as its change points: steps[i] is the first step
+    # (month, year, week...) at which values[i] holds; it holds until the
+    # next change point. Memory grows with the number of price changes, not
+    # with the horizon. Reads before the first change point return None.
+
+    __slots__ = ("steps", "values")
+
+    def __init__(self, initial=None, start=0):
+        self.steps = []
+        self.values = []
+        if initial is not None:
+            self.steps.append(start)
+            self.values.append(initial)
+
+    def __len__(self):
+        return len(self.steps)
+
+    def __bool__(self):
+        return bool(self.steps)
+
+    def __contains__(self, step):
+        return bool(self.steps) and step >= self.steps[0]
+
+    def __getitem__(self, step):
+        i = bisect_right(self.steps, step) - 1
+        if i < 0:
+            raise KeyError(step)
+        return self.values[i]
+
+    def get(self, step, default=None):
+        i = bisect_right(self.steps, step) - 1
+        return self.values[i] if i >= 0 else default
+
+    def __setitem__(self, step, value):
+        # Sets the price from `step` on. Writes at or after the last change
+        # point, the only kind a forward simulation makes, are O(1); a write
+        # that repeats the price in force adds no change point.
+        steps, values = self.steps, self.values
+        if not steps or step > steps[-1]:
+            if not values or values[-1] != value:
+                steps.append(step)
+                values.append(value)
+        elif step == steps[-1]:
+            if len(values) > 1 and values[-2] == value:
+                steps.pop()
+                values.pop()
+            else:
+                values[-1] = value
+        else:
+            i = bisect_right(steps, step) - 1
+            if i >= 0 and steps[i] == step:
+                values[i] = value
+            else:
+                steps.insert(i + 1, step)
+                values.insert(i + 1, value)
+
+    def change_points(self):
+        return list(zip(self.steps, self.values))
+
+    def sample(self, positions):
+        # Prices at an array of steps, NaN before the first change point
+        positions = np.asarray(positions)
+        values = np.append(np.nan, np.asarray(self.values, dtype=float))
+        return values[np.searchsorted(self.steps, positions, side="right")]
+
+    def to_array(self, length):
+        # Dense prices for steps 0 .. length - 1
+        return self.sample(np.arange(length))
+
+
+def series_from_array(values):
+    # ChangePointSeries of a dense price row; NaN entries before the first
+    # price are skipped
+    values = np.asarray(values, dtype=float)
+    known = np.flatnonzero(~np.isnan(values))
+    series = ChangePointSeries()
+    if not len(known):
+        return series
+    row = values[known[0]:]
+    starts = np.flatnonzero(np.r_[True, row[1:] != row[:-1]])
+    series.steps = (starts + known[0]).tolist()
+    series.values = row[starts].tolist()
+    return series
+
+
+def calendar_prices(change_points, start_year, years, step="week"):
+    # Long frame of Drug, Country, Date, Price on a weekly or daily grid from
+    # {(drug, country): ChangePointSeries} of monthly prices, as filled in by
+    # the simulators' change_points argument.
+    dates, positions = calendar_steps(start_year, years, step)
+    keys = list(change_points)
+    drugs = list(dict.fromkeys(drug for drug, _ in keys))
+    countries = list(dict.fromkeys(country for _, country in keys))
+    drug_code = {drug: i for i, drug in enumerate(drugs)}
+    country_code = {country: i for i, country in enumerate(countries)}
+    prices = np.empty(len(keys) * len(dates))
+    for i, key in enumerate(keys):
+        prices[i * len(dates):(i + 1) * len(dates)] = change_points[key].sample(positions)
+    return pd.DataFrame({
+        "Drug": pd.Categorical.from_codes(np.repeat([drug_code[d] for d, _ in keys], len(dates)), categories=drugs),
+        "Country": pd.Categorical.from_codes(
+            np.repeat([country_code[c] for _, c in keys], len(dates)), categories=countries
+        ),
+        "Date": np.tile(dates.to_numpy(), len(keys)),
+        "Price": prices,
+    })
+
+
+def calendar_steps(start_year, years, step="week"):
+    # Dates of a weekly or daily grid over `years` years from 1 January
+    # start_year and, for each date, the month index (months since January
+    # start_year) whose price is in force. Monthly series sampled at these
+    # positions give weekly or daily prices without storing a value per step.
+    if step == "month":
+        dates = pd.date_range(f"{start_year}-01-01", periods=years * 12 + 1, freq="MS")
+    elif step in STEP_DAYS:
+        dates = pd.date_range(
+            f"{start_year}-01-01", f"{start_year + years}-01-01", freq=f"{STEP_DAYS[step]}D"
+        )
+    else:
+        raise ValueError(f"Unknown step: {step}")
+    positions = (dates.year.to_numpy() - start_year) * 12 + dates.month.to_numpy() - 1
+    return dates, positions
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# Part of every key; bump it when simulation output changes so stale disk
+# entries are no longer hit.
+CACHE_VERSION = 1
+
+
+def _canonical(value):
+    # JSON-able form of simulation inputs that does not depend on dict order
+    # and keeps 1, 1.0, "1" and True apart.
+    if isinstance(value, dict):
+        items = [(_canonical(k), _canonical(v)) for k, v in value.items()]
+        return ["dict", sorted(items, key=lambda item: json.dumps(item[0]))]
+    if isinstance(value, (list, tuple)):
+        return ["list", [_canonical(v) for v in value]]
+    if isinstance(value, (set, frozenset)):
+        return ["set", sorted((_canonical(v) for v in value), key=json.dumps)]
+    if isinstance(value, np.ndarray):
+        digest = hashlib.sha256(np.ascontiguousarray(value).tobytes()).hexdigest()
+        return ["array", value.dtype.str, list(value.shape), digest]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, int):
+        return ["int", str(value)]
+    if isinstance(value, float):
+        return ["float", repr(value)]
+    if isinstance(value, str):
+        return value
+    raise TypeError(f"Cannot hash {type(value).__name__} as a simulation input")
+
+
+def input_key(*parts):
+    # Stable hex digest of simulation inputs, e.g. (policies, prices,
+    # volumes, interventions, horizon). Equal inputs give equal keys across
+    # processes and sessions.
+    payload = json.dumps([CACHE_VERSION, _canonical(list(parts))], separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def entry_size(value):
+    # Approximate bytes held by a cached value
+    if isinstance(value, (tuple, list)):
+        return sum(entry_size(v) for v in value)
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+
+class ResultCache:
+    # Simulation results keyed by input_key. Entries live in memory until
+    # more than max_entries or max_bytes are held, then the least recently
+    # used go first. With a directory, entries are also pickled to disk,
+    # where they outlive the process and are evicted oldest-read first once
+    # max_disk_bytes is exceeded. Cached values are shared, so callers must
+    # not modify them. Safe to use from several threads.
+
+    def __init__(self, max_entries=32, max_bytes=512 * 1024 * 1024, directory=None, max_disk_bytes=2 * 1024 ** 3):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries or (self.directory is not None and os.path.exists(self._path(key)))
+
+    @property
+    def size_bytes(self):
+        return self._bytes
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+        value = self._read(key)
+        if value is None:
+            with self._lock:
+                self.misses += 1
+            return default
+        with self._lock:
+            self.disk_hits += 1
+            self._remember(key, value)
+        return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._remember(key, value)
+        self._write(key, value)
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remember(self, key, value):
+        size = entry_size(value)
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= evicted
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".pkl")
+
+    def _read(self, key):
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def _write(self, key, value):
+        if self.directory is None:
+            return
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+        except (OSError, pickle.PicklingError):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        self._trim_disk()
+
+    def _trim_disk(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".pkl"):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
@@ -0,0 +1,88 @@
+import time
+from contextlib import contextmanager, nullcontext
+import pandas as pd
+
+
+class SimulationStats:
+    # Timings and counters of a simulation run, filled in when passed as
+    # `stats` to run_irp_simulation_with_interventions. Phase times are wall
+    # seconds and counters add up, so one object can also collect several
+    # runs. basket_sizes maps a basket size to the number of IRP evaluations
+    # that reduced a basket of that size. converged_month is the month index
+    # from which prices stayed fixed and stopped_month the month after which
+    # the engine stopped reviewing, both None when the run never settled.
+
+    def __init__(self):
+        self.engine = None
+        self.phases = {}
+        self.series = 0
+        self.months = 0
+        self.irp_evaluations = 0
+        self.price_changes = 0
+        self.interventions_applied = 0
+        self.basket_sizes = {}
+        self.output_rows = 0
+        self.converged_month = None
+        self.stopped_month = None
+
+    def add_time(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def count_reviews(self, events, series):
+        # Each IRP event is evaluated once per simulated price series
+        for event in events:
+            self.irp_evaluations += series
+            size = len(event.basket)
+            self.basket_sizes[size] = self.basket_sizes.get(size, 0) + series
+
+    def count_changes(self, event_log, start=0):
+        # IRP events that moved a price and applied interventions, logged
+        # from entry `start` on. Reviews whose result equals the current
+        # price are logged too, but change nothing.
+        for i in range(start, len(event_log)):
+            if event_log.type[i] != "irp":
+                self.interventions_applied += 1
+            elif event_log.price_after[i] != event_log.price_before[i]:
+                self.price_changes += 1
+
+    @property
+    def total_seconds(self):
+        return sum(self.phases.values())
+
+    def counters(self):
+        evaluations = self.irp_evaluations
+        members = sum(size * count for size, count in self.basket_sizes.items())
+        return {
+            "engine": self.engine,
+            "series": self.series,
+            "months": self.months,
+            "irp_evaluations": evaluations,
+            "price_changes": self.price_changes,
+            "change_rate": self.price_changes / evaluations if evaluations else 0.0,
+            "interventions_applied": self.interventions_applied,
+            "mean_basket_size": members / evaluations if evaluations else 0.0,
+            "largest_basket": max(self.basket_sizes, default=0),
+            "output_rows": self.output_rows,
+            "converged_month": self.converged_month,
+            "stopped_month": self.stopped_month,
+        }
+
+    def phase_frame(self):
+        total = self.total_seconds
+        return pd.DataFrame(
+            [(name, seconds, seconds / total if total else 0.0) for name, seconds in self.phases.items()],
+            columns=["Phase", "Seconds", "Share"]
+        )
+
+
+def timed(stats, name):
+    # stats.phase(name), or a no-op context when no stats are collected
+    return nullcontext() if stats is None else stats.phase(name)
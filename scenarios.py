@@ -0,0 +1,128 @@
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from irp_events import EventLog
+from vectorized_simulator import (
+    assemble_frame, index_interventions, new_event_log, prepare_simulation, rationale_texts, run_months, volume_cube
+)
+from worker_pool import WorkerPool, chunked, rows_per_chunk
+
+# Scenarios a batch needs before it is spread over worker processes
+PARALLEL_MIN_SCENARIOS = 64
+
+ScenarioBatchResult = namedtuple("ScenarioBatchResult", ["summary", "detail"])
+
+
+def _revenue(prices, volumes):
+    return np.round(np.nan_to_num(prices) * volumes, 2).sum(axis=(-2, -1))
+
+
+def _simulate_chunk(state, chunk):
+    # chunk: [(scenario id, indexed interventions)]. Every scenario gets one
+    # row per drug it intervenes on; all rows share one month loop.
+    setup, volumes, detail = state["setup"], state["volumes"], state["detail"]
+    row_keys = []
+    interventions_by_month = {}
+    for scenario, indexed in chunk:
+        drugs = sorted({d for due in indexed.values() for d, _ in due})
+        row_of = {}
+        for d in drugs:
+            row_of[d] = len(row_keys)
+            row_keys.append((scenario, d))
+        for m, due in indexed.items():
+            interventions_by_month.setdefault(m, []).extend((row_of[d], event) for d, event in due)
+    if not row_keys:
+        return {}, None, None
+
+    drug_rows = [d for _, d in row_keys]
+    prices = setup.initial[drug_rows]
+    event_log = EventLog() if detail else None
+    run_months(setup, prices, event_log, row_keys, interventions_by_month)
+    revenue = dict(zip(row_keys, _revenue(prices, volumes[drug_rows])))
+    if not detail:
+        return revenue, None, None
+    return revenue, dict(zip(row_keys, prices)), event_log
+
+
+def _scenario_rows(item):
+    _, indexed = item
+    return len({d for due in indexed.values() for d, _ in due})
+
+
+def run_scenario_batch(
+    initial_prices,
+    volumes,
+    irp_policies,
+    intervention_sets,
+    years=10,
+    start_year=2025,
+    detail=False,
+    processes=None
+):
+    # Simulates every intervention set against the same prices, volumes and
+    # policies. Policies are compiled and baskets indexed once; each scenario
+    # only simulates the drugs it intervenes on, the rest reuse the baseline.
+    # Returns ScenarioBatchResult(summary, detail): summary has one row per
+    # scenario and drug, detail is the monthly frame with a Scenario column
+    # when detail=True and None otherwise.
+    setup = prepare_simulation(initial_prices, irp_policies, None, years, start_year)
+    volumes_cube = volume_cube(setup, volumes)
+    drug_rows = list(range(len(setup.drugs)))
+
+    baseline = setup.initial.copy()
+    baseline_events = EventLog() if detail else None
+    run_months(setup, baseline, baseline_events, drug_rows, {})
+    if detail:
+        baseline_events.relabel(setup.drugs, setup.registry.names)
+    baseline_revenue = _revenue(baseline, volumes_cube)
+
+    indexed_sets = [index_interventions(setup, interventions) for interventions in intervention_sets]
+    scenarios = list(enumerate(indexed_sets))
+    total_rows = sum(_scenario_rows(item) for item in scenarios)
+    pool = WorkerPool(
+        {"setup": setup, "volumes": volumes_cube, "detail": detail}, processes, min_items=PARALLEL_MIN_SCENARIOS
+    )
+    chunk_rows = rows_per_chunk(total_rows, baseline[0].nbytes, pool.workers if pool.parallel(len(scenarios)) else 1)
+    with pool:
+        results = pool.map(_simulate_chunk, chunked(scenarios, chunk_rows, _scenario_rows), len(scenarios))
+
+    revenue, scenario_prices, scenario_events = {}, {}, {}
+    for chunk_revenue, chunk_prices, chunk_events in results:
+        revenue.update(chunk_revenue)
+        if detail and chunk_prices:
+            scenario_prices.update(chunk_prices)
+            chunk_events.relabel(countries=setup.registry.names)
+            rows_by_scenario = {}
+            for i, (scenario, d) in enumerate(chunk_events.drug):
+                rows_by_scenario.setdefault(scenario, []).append(i)
+            for scenario, rows in rows_by_scenario.items():
+                scenario_log = chunk_events.select(rows)
+                scenario_log.relabel(drugs={(scenario, d): drug for d, drug in enumerate(setup.drugs)})
+                scenario_events[scenario] = scenario_log
+
+    summary = pd.DataFrame(
+        [
+            (scenario, drug, revenue.get((scenario, d), baseline_revenue[d]), baseline_revenue[d])
+            for scenario in range(len(indexed_sets))
+            for d, drug in enumerate(setup.drugs)
+        ],
+        columns=["Scenario", "Drug", "Revenue_Scenario", "Revenue_Baseline"]
+    )
+    summary["Revenue_Diff"] = summary["Revenue_Baseline"] - summary["Revenue_Scenario"]
+    if not detail:
+        return ScenarioBatchResult(summary, None)
+
+    frames = []
+    for scenario in range(len(indexed_sets)):
+        replaced = {setup.drugs[d] for d in drug_rows if (scenario, d) in scenario_prices}
+        prices = baseline.copy()
+        for drug in replaced:
+            prices[setup.drug_index[drug]] = scenario_prices[(scenario, setup.drug_index[drug])]
+        event_log = new_event_log(setup, None)
+        event_log.extend(baseline_events, lambda i: baseline_events.drug[i] not in replaced)
+        if scenario in scenario_events:
+            event_log.extend(scenario_events[scenario])
+        frame = assemble_frame(setup, initial_prices, volumes_cube, prices, rationale_texts(setup, prices, event_log))
+        frame.insert(0, "Scenario", scenario)
+        frames.append(frame)
+    return ScenarioBatchResult(summary, pd.concat(frames, ignore_index=True))
@@ -1,7 +1,17 @@
 
 import statistics
+import time
 from collections import defaultdict
-import pandas as pd
+import numpy as np
+from country_registry import resolve_policies_for_prices
+from irp_data import series_values
+from irp_events import EventLog
+from interventions import index_by_month_and_drug, priced_countries, validate_interventions
+from irp_output import assemble_result_frame
+from irp_schedule import SteadyState, build_month_map, compile_irp_schedule, group_by_level, group_by_month
+from price_series import ChangePointSeries
+from run_stats import timed
+from vectorized_simulator import run_irp_simulation_incremental, run_irp_simulation_vectorized
 
 def run_irp_simulation_with_interventions(
     initial_prices,
@@ -10,13 +20,63 @@ def run_irp_simulation_with_interventions(
     interventions=None,
     years=10,
     start_year=2025,
-    start_month=1
+    start_month=1,
+    engine="dict",
+    baseline=None,
+    rationale=True,
+    event_log=None,
+    baseline_events=None,
+    stats=None,
+    change_points=None
 ):
+    # `baseline` is a previous result for the same prices, volumes and
+    # policies; when given, only what the interventions can reach is re-run.
+    # Every applied IRP event and intervention is recorded in `event_log`
+    # when an EventLog is passed. rationale=False leaves out the Rationale
+    # column; it can be built later from the log. Pass a SimulationStats as
+    # `stats` to collect phase timings and counters of the run. A dict passed
+    # as change_points receives each drug and country's final prices as a
+    # ChangePointSeries over month indices.
+    if baseline is not None:
+        if engine != "numpy":
+            raise ValueError("Re-using a baseline requires engine='numpy'")
+        return run_irp_simulation_incremental(
+            baseline,
+            initial_prices,
+            volumes,
+            irp_policies,
+            interventions=interventions,
+            years=years,
+            start_year=start_year,
+            start_month=start_month,
+            rationale=rationale,
+            event_log=event_log,
+            baseline_events=baseline_events,
+            stats=stats,
+            change_points=change_points
+        )
+    if engine == "numpy":
+        return run_irp_simulation_vectorized(
+            initial_prices,
+            volumes,
+            irp_policies,
+            interventions=interventions,
+            years=years,
+            start_year=start_year,
+            start_month=start_month,
+            rationale=rationale,
+            event_log=event_log,
+            stats=stats,
+            change_points=change_points
+        )
+    elif engine != "dict":
+        raise ValueError(f"Unknown engine: {engine}")
+
     def compute_irp_price(prices_by_country, basket, rule, year_month):
         prices = [
             prices_by_country[c].get(year_month)
             for c in basket
-            if year_month in prices_by_country[c]
+            if c in prices_by_country
         ]
         prices = [p for p in prices if p is not None]
         if not prices:
@@ -32,80 +92,186 @@ def run_irp_simulation_with_interventions(
     def month_index(year, month):
         return (year - start_year) * 12 + (month - start_month)
 
-    price_series = defaultdict(lambda: defaultdict(dict))
-    rationale_map = {}
+    # Phase clocks are only read when stats are collected
+    timing = stats is not None
+    clock = time.perf_counter
+    if timing:
+        started = clock()
+    registry, irp_policies, _ = resolve_policies_for_prices(irp_policies, initial_prices)
+    price_series = defaultdict(dict)
+    event_log = EventLog() if event_log is None else event_log
+    first_entry = len(event_log)
     YEARS = range(0, years + 1)
     total_months = years * 12
-    month_map = [(start_year + (m // 12), (m % 12) + 1) for m in range(total_months + 1)]
+    month_map = build_month_map(years, start_year)
+    schedule = compile_irp_schedule(irp_policies, month_map)
+    events_by_month = group_by_month(schedule)
+    levels_by_month = {m: group_by_level(due) for m, due in events_by_month.items()}
+    event_log.month_map = month_map
+    interventions_by_key = index_by_month_and_drug(
+        validate_interventions(interventions, priced_countries(initial_prices, registry), registry, month_map)
+    )
 
-    for drug, countries in initial_prices.items():
-        for country, price in countries.items():
-            price_series[drug][country][0] = price
+    def apply_interventions(drug, m):
+        for event in interventions_by_key.get((m, drug), ()):
+            current_price = price_series[drug][event.country].get(m)
+            if event.mode == "percent":
+                new_price = round(current_price * (1 - event.value / 100), 2)
+            else:
+                new_price = round(event.value, 2)
+            if new_price != current_price:
+                steady.changed(m)
+            price_series[drug][event.country][m] = new_price
+            event_log.record_intervention(drug, event.country, m, event.mode, event.value, current_price, new_price)
 
-    for m in range(1, total_months + 1):
-        year, month = month_map[m]
+    steady = SteadyState(schedule, max((m for m, _ in interventions_by_key), default=-1))
+    priced = {drug: [registry.canonical(c) for c in countries] for drug, countries in initial_prices.items()}
+    for drug, countries in initial_prices.items():
+        for country, price in zip(priced[drug], countries.values()):
+            price_series[drug][country] = ChangePointSeries(price)
+        apply_interventions(drug, 0)
+    if timing:
+        stats.add_time("setup", clock() - started)
 
+    # Only months with a review or an intervention are visited, as in
+    # vectorized_simulator.run_months. Series only store change points, so
+    # prices carry forward over the months in between without being copied.
+    months = sorted(m for m in set(events_by_month) | {m for m, _ in interventions_by_key} if 1 <= m <= total_months)
+    intervention_seconds = irp_seconds = 0.0
+    stopped_at = None
+    if total_months > 0 and steady.settled(0):
+        months, stopped_at = [], 0
+    for m in months:
         for drug in initial_prices:
-            for country in initial_prices[drug]:
-                prev_price = price_series[drug][country].get(m - 1)
-                if prev_price is not None:
-                    price_series[drug][country][m] = prev_price
+            if timing:
+                t1 = clock()
+            apply_interventions(drug, m)
 
-            if interventions:
-                for event in interventions:
-                    if (event["year"], event["month"]) == (year, month) and event["drug"] == drug:
-                        current_price = price_series[drug][event["country"]][m]
-                        if event["mode"] == "percent":
-                            new_price = round(current_price * (1 - event["value"] / 100), 2)
-                        else:
-                            new_price = round(event["value"], 2)
-                        price_series[drug][event["country"]][m] = new_price
-                        rationale_map[(drug, event["country"], year, month)] = (
-                            f"Intervention: {'-' if event['mode'] == 'percent' else ''}{event['value']} {'%' if event['mode'] == 'percent' else '€'}"
-                        )
-
-            for country, policy in irp_policies.items():
-                freq = policy.get("frequency", 12)
-                delay = policy.get("enforcement_delay", 0)
-                rule = policy.get("rule", "average")
-                basket = policy.get("basket", [])
-                allow_increase = policy.get("allow_increase", False)
-
-                if (m - delay) >= 0 and (m - delay) % freq == 0:
-                    collected_at = m - delay
-                    enforced_at = collected_at + delay
-                    if enforced_at > total_months:
-                        continue
-                    irp_price = compute_irp_price(price_series[drug], basket, rule, collected_at)
+            if timing:
+                t2 = clock()
+            # Reviews of one level all read before any of them writes
+            for level in levels_by_month.get(m, []):
+                writes = []
+                for event in level:
+                    country = event.country
+                    irp_price = compute_irp_price(price_series[drug], event.basket, event.rule, event.collected_at)
+                    steady.reviewed(event)
                     if irp_price is None:
                         continue
-                    current_price = price_series[drug][country].get(enforced_at)
+                    if country not in price_series[drug]:
+                        continue
+                    current_price = price_series[drug][country].get(m)
                     if current_price is None:
                         continue
-                    if allow_increase or irp_price < current_price:
-                        price_series[drug][country][enforced_at] = round(irp_price, 2)
-                        rationale_map[(drug, country, *month_map[enforced_at])] = (
-                            f"IRP Event: Rule={rule}, Basket={', '.join([f'{c}: {price_series[drug][c].get(collected_at, 'N/A')}' for c in basket])}"
+                    if event.allow_increase or irp_price < current_price:
+                        writes.append((event, current_price, round(irp_price, 2)))
+                for event, current_price, new_price in writes:
+                    if new_price != current_price:
+                        steady.changed(m)
+                    price_series[drug][event.country][m] = new_price
+                    event_log.record_irp(
+                        drug, event.country, m, event.rule, event.collected_at, event.basket, current_price, new_price
+                    )
+            if timing:
+                t3 = clock()
+                intervention_seconds += t2 - t1
+                irp_seconds += t3 - t2
+        # Settledness only moves at visited months, so checking after each of
+        # them stops where a month-by-month check would
+        if m < total_months and steady.settled(m):
+            stopped_at = m
+            break
+
+    if stopped_at is not None:
+        # Nothing changes any more, so the series already hold the remaining
+        # months. Reviews whose result rounds to the current price still log
+        # it, taken from one evaluation per drug and policy.
+        settled_prices = {}
+        for m in range(stopped_at + 1, total_months + 1):
+            for drug in initial_prices:
+                for event in events_by_month.get(m, []):
+                    if event.country not in price_series[drug]:
+                        continue
+                    key = (drug, event.order)
+                    if key not in settled_prices:
+                        settled_prices[key] = compute_irp_price(price_series[drug], event.basket, event.rule, event.collected_at)
+                    irp_price = settled_prices[key]
+                    current_price = price_series[drug][event.country].get(m)
+                    if irp_price is None or current_price is None:
+                        continue
+                    if event.allow_increase or irp_price < current_price:
+                        event_log.record_irp(
+                            drug, event.country, m, event.rule, event.collected_at, event.basket,
+                            current_price, round(irp_price, 2)
                         )
 
-    output_rows = []
-    for drug in price_series:
-        for country in price_series[drug]:
-            for m in range(total_months + 1):
-                year, month = month_map[m]
-                price = price_series[drug][country].get(m)
-                volume = volumes.get(drug, {}).get(country, {}).get(m, 0)
-                revenue = round(price * volume, 2) if price is not None else None
-                rationale = rationale_map.get((drug, country, year, month), "Carry-forward")
-                output_rows.append({
-                    "Drug": drug,
-                    "Country": country,
-                    "Year": year,
-                    "Month": month,
-                    "Price": price,
-                    "Volume": volume,
-                    "Revenue": revenue,
-                    "Rationale": rationale
-                })
+    if change_points is not None:
+        change_points.update(
+            ((drug, country), series) for drug in price_series for country, series in price_series[drug].items()
+        )
+    if timing:
+        stats.engine = "dict"
+        stats.add_time("interventions", intervention_seconds)
+        stats.add_time("irp", irp_seconds)
+        stats.series += sum(len(countries) for countries in priced.values())
+        stats.months += total_months + 1
+        stats.count_reviews(
+            [e for e in schedule if stopped_at is None or e.month <= stopped_at], len(initial_prices)
+        )
+        if stopped_at is not None:
+            stats.converged_month = steady.last_change
+            stats.stopped_month = stopped_at
+        stats.count_changes(event_log, first_entry)
+
+        started = clock()
+    series_keys = [(drug, country) for drug in price_series for country in price_series[drug]]
+    drug_names = list(price_series)
+    country_names = list(dict.fromkeys(country for _, country in series_keys))
+    drug_code = {d: i for i, d in enumerate(drug_names)}
+    country_code = {c: i for i, c in enumerate(country_names)}
+    row_of = {key: row for row, key in enumerate(series_keys)}
+
+    prices = np.array(
+        [price_series[drug][country].to_array(total_months + 1) for drug, country in series_keys],
+        dtype=float
+    ).reshape(len(series_keys), total_months + 1)
+    # Volume keys resolve through the registry like prices do, as in
+    # vectorized_simulator.volume_cube
+    volume_series = {
+        (drug, registry.canonical(country)): series
+        for drug in price_series
+        for country, series in volumes.get(drug, {}).items()
+        if country in registry
+    }
+    volume_rows = np.array(
+        [series_values(volume_series.get(key, {}), total_months + 1) for key in series_keys]
+    ).reshape(len(series_keys), total_months + 1)
+    if timing:
+        stats.add_time("assembly", clock() - started)
+    rationale_map = None
+    if rationale:
+        def price_of(drug, country, m):
+            return price_series[drug].get(country, {}).get(m)
+
+        with timed(stats, "rationale"):
+            rationale_map = {
+                (row_of[(drug, country)], m): text
+                for (drug, country, m), text in event_log.rationale(price_of).items()
+            }
 
-    return pd.DataFrame(output_rows)
+    with timed(stats, "assembly"):
+        result = assemble_result_frame(
+            drug_names,
+            np.array([drug_code[drug] for drug, _ in series_keys], dtype=np.int64),
+            country_names,
+            np.array([country_code[country] for _, country in series_keys], dtype=np.int64),
+            month_map,
+            prices,
+            volume_rows,
+            rationale_map
+        )
+    # (year, month) from which prices stay fixed, None if the run never settled
+    result.attrs["converged_at"] = None if stopped_at is None else month_map[steady.last_change]
+    if timing:
+        stats.output_rows += len(result)
+    return result
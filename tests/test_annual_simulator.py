@@ -0,0 +1,35 @@
+import numpy as np
+from Simulator import run_irp_simulation_with_intervention
+
+INITIAL_PRICES = {"D": {"A": 10.0, "B": 5.0}}
+VOLUMES = {"D": {"A": {year: 100 for year in range(7)}, "X": {year: 10 for year in range(7)}}}
+POLICIES = {
+    "X": {"basket": ["A", "B"], "rule": "min", "frequency": 2},
+    "A": {"basket": ["B", "X"], "rule": "average", "frequency": 3, "enforcement_delay": 1},
+}
+
+
+def prices(result, country):
+    return result[result["Country"] == country]["Price"].tolist()
+
+
+def test_priced_countries_carry_their_prices_forward():
+    result = run_irp_simulation_with_intervention(INITIAL_PRICES, VOLUMES, POLICIES, years=6)
+    assert prices(result, "A") == [10.0, 5.0, 5.0, 5.0, 5.0, 5.0, 5.0]
+    assert prices(result, "B") == [5.0] * 7
+
+
+def test_unpriced_countries_only_hold_their_review_years():
+    # X has a policy but no initial price: years between its reviews stay
+    # empty rather than carrying the last IRP price forward
+    result = run_irp_simulation_with_intervention(INITIAL_PRICES, VOLUMES, POLICIES, years=6)
+    np.testing.assert_array_equal(prices(result, "X"), [np.nan, np.nan, 5.0, np.nan, 5.0, np.nan, 5.0])
+    assert result[result["Country"] == "X"]["Revenue"].isna().tolist() == [True, True, False, True, False, True, False]
+
+
+def test_intervention_carries_forward_into_reviews():
+    intervention = {"drug": "D", "country": "B", "year": 2, "reduction_pct": 0.5}
+    result = run_irp_simulation_with_intervention(INITIAL_PRICES, VOLUMES, POLICIES, intervention, years=6)
+    assert prices(result, "B") == [5.0, 5.0, 2.5, 2.5, 2.5, 2.5, 2.5]
+    assert prices(result, "A") == [10.0, 5.0, 5.0, 5.0, 2.5, 2.5, 2.5]
+    np.testing.assert_array_equal(prices(result, "X"), [np.nan, np.nan, 5.0, np.nan, 2.5, np.nan, 2.5])
@@ -0,0 +1,35 @@
+import warnings
+import pytest
+from country_registry import CountryRegistry, resolve_policies_for_prices
+
+
+def test_aliases_and_codes_resolve_to_one_id():
+    registry = CountryRegistry(["Czech Republic", "Austria", "Czechia", "GB"])
+    assert registry.names == ["Czech Republic", "Austria", "GB"]
+    assert registry["CZ"] == registry["czechia"] == registry["CZE"] == 0
+    assert registry.canonical("United Kingdom") == "GB"
+    assert "Germany" not in registry
+
+
+def test_known_countries_without_prices_are_dropped_silently():
+    registry = CountryRegistry(["Austria", "Belgium"])
+    ids, unresolved = registry.resolve_basket(["Belgium", "Germany", "FRA", "Atlantis"])
+    assert ids.tolist() == [1]
+    assert unresolved == ["Atlantis"]
+
+
+def test_only_unknown_basket_names_are_reported():
+    policies = {"Austria": {"basket": ["Belgium", "Germany", "Atlantis"], "rule": "min"}}
+    with pytest.warns(UserWarning, match="Atlantis") as caught:
+        _, resolved, unresolved = resolve_policies_for_prices(policies, {"D": {"Austria": 10.0, "BE": 9.0}})
+    assert "Germany" not in str(caught[0].message)
+    assert resolved["Austria"]["basket"] == ["BE"]
+    assert unresolved == {"Austria": ["Atlantis"]}
+
+
+def test_unpriced_known_countries_do_not_warn():
+    policies = {"Austria": {"basket": ["Belgium", "Germany", "France"], "rule": "min"}}
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        _, _, unresolved = resolve_policies_for_prices(policies, {"D": {"Austria": 10.0, "Belgium": 9.0}})
+    assert unresolved == {}
@@ -0,0 +1,180 @@
+import random
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.synthetic import generate_portfolio
+from irp_events import EventLog
+from irp_schedule import SteadyState
+from run_stats import SimulationStats
+import scenarios
+from scenarios import run_scenario_batch
+from simulator import run_irp_simulation_with_interventions
+
+KEYS = ["Drug", "Country", "Year", "Month"]
+# Other spellings the registry resolves to the same country
+ALIASES = {
+    "Czech Republic": "Czechia",
+    "United Kingdom": "UK",
+    "Turkey": "Türkiye",
+    "Germany": "DE",
+    "Netherlands": "NLD",
+}
+
+
+def random_portfolio(seed, drugs=3, countries=40, years=5, interventions=12, aliases=True):
+    # Synthetic portfolio whose second drug spells some countries differently
+    # from the first, in its prices, volumes and interventions
+    portfolio = generate_portfolio(
+        drugs=drugs, countries=countries, years=years, basket_density=0.15, interventions=interventions, seed=seed
+    )
+    initial_prices, volumes = portfolio.initial_prices, portfolio.volumes
+    if aliases and drugs > 1:
+        drug = list(initial_prices)[1]
+        rename = {c: ALIASES.get(c, c) for c in initial_prices[drug]}
+        initial_prices[drug] = {rename[c]: price for c, price in initial_prices[drug].items()}
+        volumes[drug] = {rename[c]: series for c, series in volumes[drug].items()}
+        for event in portfolio.interventions:
+            if event["drug"] == drug:
+                event["country"] = rename[event["country"]]
+    return portfolio
+
+
+def run(portfolio, engine, interventions=None, **kwargs):
+    return run_irp_simulation_with_interventions(
+        portfolio.initial_prices,
+        portfolio.volumes,
+        portfolio.irp_policies,
+        portfolio.interventions if interventions is None else interventions,
+        years=portfolio.years,
+        engine=engine,
+        **kwargs
+    )
+
+
+def assert_same_result(expected, actual, rationale=True):
+    columns = ["Price", "Volume", "Revenue"] + (["Rationale"] if rationale else [])
+    expected = expected.astype({"Drug": str, "Country": str}).sort_values(KEYS, ignore_index=True)
+    actual = actual.astype({"Drug": str, "Country": str}).sort_values(KEYS, ignore_index=True)
+    pd.testing.assert_frame_equal(expected[KEYS], actual[KEYS], check_dtype=False)
+    for column in columns:
+        pd.testing.assert_series_equal(expected[column], actual[column], check_dtype=False, obj=column)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_numpy_engine_matches_dict_engine(seed):
+    portfolio = random_portfolio(seed)
+    assert_same_result(run(portfolio, "dict"), run(portfolio, "numpy"))
+
+
+def test_country_spellings_may_differ_between_drugs():
+    volumes = {m: 1 for m in range(13)}
+    initial_prices = {"A": {"Czechia": 10.0}, "B": {"Czech Republic": 10.0}}
+    for engine in ("dict", "numpy"):
+        result = run_irp_simulation_with_interventions(
+            initial_prices, {"A": {"Czechia": volumes}, "B": {"Czech Republic": volumes}},
+            {}, [], years=1, engine=engine
+        )
+        revenue = result.groupby("Drug", observed=True)["Revenue"].sum()
+        assert revenue.to_dict() == {"A": 130.0, "B": 130.0}, engine
+
+
+def test_numpy_engine_matches_dict_engine_without_interventions():
+    portfolio = random_portfolio(7, drugs=2, interventions=0)
+    assert_same_result(run(portfolio, "dict"), run(portfolio, "numpy"))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_incremental_run_matches_full_run(seed):
+    portfolio = random_portfolio(seed, interventions=[1, 4, 10][seed])
+    baseline_events = EventLog()
+    baseline = run(portfolio, "numpy", interventions=[], event_log=baseline_events)
+    full = run(portfolio, "dict")
+    assert_same_result(full, run(portfolio, "numpy", baseline=baseline, baseline_events=baseline_events))
+    # Rationale of copied cells taken from the baseline frame instead
+    assert_same_result(full, run(portfolio, "numpy", baseline=baseline))
+
+
+def scenario_sets(portfolio, count, seed=0):
+    rnd = random.Random(seed)
+    return [rnd.sample(portfolio.interventions, k % 4) for k in range(count)]
+
+
+def test_scenario_batch_matches_full_runs():
+    portfolio = random_portfolio(11)
+    sets = scenario_sets(portfolio, 6)
+    batch = run_scenario_batch(
+        portfolio.initial_prices, portfolio.volumes, portfolio.irp_policies, sets, years=portfolio.years, detail=True
+    )
+    for scenario, interventions in enumerate(sets):
+        full = run(portfolio, "dict", interventions=interventions)
+        detail = batch.detail[batch.detail["Scenario"] == scenario].drop(columns="Scenario")
+        assert_same_result(full, detail)
+        revenue = full.astype({"Drug": str}).groupby("Drug")["Revenue"].sum()
+        summary = batch.summary[batch.summary["Scenario"] == scenario].set_index("Drug")["Revenue_Scenario"]
+        np.testing.assert_allclose(summary[revenue.index].to_numpy(), revenue.to_numpy())
+
+
+def test_scenario_batch_in_processes_matches_in_process(monkeypatch):
+    portfolio = random_portfolio(12, countries=25)
+    sets = scenario_sets(portfolio, 8, seed=1)
+    args = (portfolio.initial_prices, portfolio.volumes, portfolio.irp_policies, sets)
+    serial = run_scenario_batch(*args, years=portfolio.years, processes=1).summary
+    monkeypatch.setattr(scenarios, "PARALLEL_MIN_SCENARIOS", 1)
+    pooled = run_scenario_batch(*args, years=portfolio.years, processes=2).summary
+    pd.testing.assert_frame_equal(serial, pooled)
+
+
+@pytest.mark.parametrize("engine", ["dict", "numpy"])
+def test_early_stop_matches_run_to_horizon(engine, monkeypatch):
+    portfolio = random_portfolio(13, years=30, interventions=4)
+    stopped_events, stopped_stats = EventLog(), SimulationStats()
+    stopped = run(portfolio, engine, event_log=stopped_events, stats=stopped_stats)
+    assert stopped.attrs["converged_at"] is not None
+    # Without reviews or interventions prices are fixed from the first month
+    idle = run_irp_simulation_with_interventions({"A": {"Austria": 10.0}}, {}, {}, [], years=1, engine=engine)
+    assert idle.attrs["converged_at"] == (2025, 1)
+
+    monkeypatch.setattr(SteadyState, "settled", lambda self, month: False)
+    full_events, full_stats = EventLog(), SimulationStats()
+    full = run(portfolio, engine, event_log=full_events, stats=full_stats)
+    assert full.attrs["converged_at"] is None
+    assert_same_result(full, stopped)
+    key = ["Drug", "Country", "Year", "Month", "Type"]
+    pd.testing.assert_frame_equal(
+        full_events.to_frame().sort_values(key, ignore_index=True),
+        stopped_events.to_frame().sort_values(key, ignore_index=True)
+    )
+    # Reviews replayed after the stop are logged but change no price
+    assert stopped_stats.price_changes == full_stats.price_changes
+    assert stopped_stats.interventions_applied == full_stats.interventions_applied
+
+
+@pytest.mark.parametrize("engine", ["dict", "numpy"])
+def test_same_month_reviews_do_not_depend_on_policy_order(engine):
+    portfolio = random_portfolio(14)
+    expected = run(portfolio, engine)
+    policies = list(portfolio.irp_policies.items())
+    for seed in range(3):
+        random.Random(seed).shuffle(policies)
+        shuffled = portfolio._replace(irp_policies=dict(policies))
+        assert_same_result(expected, run(shuffled, engine))
+
+
+@pytest.mark.parametrize("engine", ["dict", "numpy"])
+def test_same_month_reviews_follow_the_reference_graph(engine):
+    # Austria references Belgium, Belgium and Croatia reference each other;
+    # all collect and enforce in February
+    review = {"rule": "min", "frequency": 12, "enforcement_delay": 0, "allow_increase": True, "review_month": 2}
+    policies = {
+        "Austria": dict(review, basket=["Belgium"]),
+        "Belgium": dict(review, basket=["Croatia"]),
+        "Croatia": dict(review, basket=["Belgium"]),
+    }
+    prices = {"X": {"Austria": 30.0, "Belgium": 20.0, "Croatia": 10.0}}
+    result = run_irp_simulation_with_interventions(prices, {}, policies, [], years=1, engine=engine)
+    february = result[(result["Year"] == 2025) & (result["Month"] == 2)]
+    # Belgium and Croatia read each other's January price; Austria reviews
+    # after them and reads Belgium's new price
+    assert dict(zip(february["Country"].astype(str), february["Price"])) == {
+        "Austria": 10.0, "Belgium": 10.0, "Croatia": 20.0
+    }
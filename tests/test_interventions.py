@@ -0,0 +1,58 @@
+import pytest
+from country_registry import CountryRegistry
+from interventions import Intervention, priced_countries, validate_interventions
+from irp_schedule import build_month_map
+from simulator import run_irp_simulation_with_interventions
+
+INITIAL_PRICES = {"A": {"Austria": 10.0, "Czechia": 8.0}, "B": {"Austria": 12.0}}
+# 2025-01 to 2026-01
+MONTH_MAP = build_month_map(1, 2025)
+
+
+def intervention(**fields):
+    return dict({"drug": "A", "country": "Austria", "year": 2025, "month": 3, "mode": "percent", "value": 10}, **fields)
+
+
+def validate(interventions):
+    registry = CountryRegistry(["Austria", "Czechia"])
+    return validate_interventions(interventions, priced_countries(INITIAL_PRICES, registry), registry, MONTH_MAP)
+
+
+def test_valid_interventions_get_month_indices_and_registry_names():
+    assert validate([intervention(), intervention(country="CZ", year=2026, month=1, mode="absolute", value=5)]) == [
+        Intervention(2, "A", "Austria", "percent", 10),
+        Intervention(12, "A", "Czechia", "absolute", 5),
+    ]
+
+
+@pytest.mark.parametrize("fields, message", [
+    ({"drug": "C"}, "unknown drug 'C'"),
+    ({"drug": "B", "country": "Czechia"}, "'Czechia' has no price for 'B'"),
+    ({"country": "Atlantis"}, "'Atlantis' has no price for 'A'"),
+    ({"year": 2026, "month": 2}, "outside the simulated horizon 2025-1 to 2026-1"),
+    ({"mode": "relative"}, "mode must be one of percent, absolute, got 'relative'"),
+])
+def test_invalid_interventions_are_reported(fields, message):
+    with pytest.raises(ValueError, match="Invalid interventions") as error:
+        validate([intervention(**fields)])
+    assert "Intervention 1 (" in str(error.value)
+    assert message in str(error.value)
+
+
+def test_all_problems_are_reported_together():
+    bad = [intervention(drug="C", mode="relative"), intervention(), {"drug": "A", "country": "Austria"}]
+    with pytest.raises(ValueError) as error:
+        validate(bad)
+    lines = str(error.value).splitlines()
+    assert lines[0] == "Invalid interventions:"
+    assert lines[1].startswith("Intervention 1 (C, Austria, 2025-3): unknown drug")
+    assert lines[2].startswith("Intervention 1 (C, Austria, 2025-3): mode must be one of")
+    assert lines[3] == "Intervention 3: missing year, month, mode, value"
+
+
+@pytest.mark.parametrize("engine", ["dict", "numpy"])
+def test_engines_reject_invalid_interventions(engine):
+    with pytest.raises(ValueError, match="outside the simulated horizon"):
+        run_irp_simulation_with_interventions(
+            INITIAL_PRICES, {}, {}, [intervention(year=2027)], years=1, engine=engine
+        )
@@ -0,0 +1,123 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from irp_data import (
+    dataset_from_dicts, dataset_prices, dataset_volumes, load_dataset, load_policies, open_dataset, save_dataset
+)
+from simulator import run_irp_simulation_with_interventions
+
+PRICES = pd.DataFrame({
+    "Drug": ["A", "A", "B"],
+    "Country": ["Austria", "Belgium", "Austria"],
+    "Price": [10.0, 9.0, 20.0],
+})
+
+
+def volumes(rows):
+    return pd.DataFrame(rows, columns=["Drug", "Country", "Year", "Month", "Volume"])
+
+
+def test_later_rows_win_in_file_order():
+    dataset = load_dataset(PRICES, volumes([
+        ("A", "Austria", 2025, 1, 5),
+        ("A", "Austria", None, None, 9),
+        ("A", "Austria", 2025, 3, 7),
+        ("A", "Belgium", None, None, 4),
+        ("A", "Belgium", 2025, 2, 6),
+        ("A", "Belgium", None, None, 3),
+    ]), years=1)
+    assert dataset.volumes[0, 0].tolist() == [9, 9, 7] + [9] * 10
+    assert dataset.volumes[0, 1].tolist() == [3] * 13
+
+
+def test_volume_rows_outside_the_horizon_are_dropped():
+    dataset = load_dataset(PRICES, volumes([
+        ("A", "Austria", 2024, 12, 5),
+        ("A", "Austria", 2026, 2, 5),
+        ("A", "Austria", 2026, 1, 8),
+        ("A", "Austria", 2025, None, 5),
+    ]), years=1)
+    assert dataset.volumes[0, 0].tolist() == [0] * 12 + [8]
+
+
+def test_csv_is_read_in_chunks(tmp_path):
+    PRICES.to_csv(tmp_path / "prices.csv", index=False)
+    rows = [("A", "Austria", 2025, m, m) for m in range(1, 13)] + [("B", "Austria", None, None, 2)]
+    volumes(rows).rename(columns={"Volume": "volumes", "Drug": "product"}).to_csv(tmp_path / "volumes.csv", index=False)
+    dataset = load_dataset(tmp_path / "prices.csv", tmp_path / "volumes.csv", years=1, chunksize=4)
+    assert dataset.drugs == ["A", "B"]
+    assert dataset.countries == ["Austria", "Belgium"]
+    np.testing.assert_array_equal(dataset.prices, [[10.0, 9.0], [20.0, np.nan]])
+    assert dataset.volumes[0, 0].tolist() == list(range(1, 13)) + [0]
+    assert dataset.volumes[1, 0].tolist() == [2] * 13
+
+
+def test_tables_without_drug_or_price_columns():
+    dataset = load_dataset(pd.DataFrame({"Country": ["Austria"], "Price": [1.0]}), drug="X", years=1)
+    assert dataset.drugs == ["X"]
+    with pytest.raises(ValueError, match="No prices found"):
+        load_dataset(pd.DataFrame({"Country": ["Austria"], "Volume": [1.0]}))
+    with pytest.raises(ValueError, match="missing a Country column"):
+        load_dataset(pd.DataFrame({"Price": [1.0]}))
+
+
+def test_policies_table():
+    policies = load_policies(pd.DataFrame({
+        "Country": ["Austria", "Belgium"],
+        "Basket": ["Belgium; Germany", None],
+        "Rule": ["Min", "average"],
+        "Frequency": [12, 6],
+        "Enforcement Delay": [1, 0],
+        "Review_Month": [3, None],
+        "Performs_IRP": ["yes", "no"],
+    }))
+    assert policies == {
+        "Austria": {
+            "basket": ["Belgium", "Germany"], "rule": "min", "frequency": 12, "enforcement_delay": 1,
+            "allow_increase": False, "review_month": 3, "performs_irp": True,
+        },
+        "Belgium": {
+            "basket": [], "rule": "average", "frequency": 6, "enforcement_delay": 0,
+            "allow_increase": False, "review_month": None, "performs_irp": False,
+        },
+    }
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_save_and_open_round_trip(tmp_path, mmap):
+    dataset = load_dataset(
+        PRICES, volumes([("A", "Austria", 2026, 1, 5), ("B", "Austria", None, None, 2)]), years=2, start_year=2026
+    )
+    dataset = dataset._replace(policies={"Austria": {"basket": ["Belgium"], "rule": "min"}})
+    save_dataset(dataset, tmp_path)
+    reopened = open_dataset(tmp_path, mmap=mmap)
+    assert (reopened.drugs, reopened.countries, reopened.start_year, reopened.policies) == (
+        dataset.drugs, dataset.countries, dataset.start_year, dataset.policies
+    )
+    np.testing.assert_array_equal(reopened.prices, dataset.prices)
+    np.testing.assert_array_equal(reopened.volumes, dataset.volumes)
+    assert isinstance(reopened.volumes, np.memmap) == mmap
+
+
+def test_open_rejects_other_versions(tmp_path):
+    save_dataset(dataset_from_dicts({"A": {"Austria": 1.0}}, {}), tmp_path)
+    meta = json.loads((tmp_path / "meta.json").read_text())
+    (tmp_path / "meta.json").write_text(json.dumps(dict(meta, version=0)))
+    with pytest.raises(ValueError, match="unsupported dataset version 0"):
+        open_dataset(tmp_path)
+
+
+def test_dataset_views_simulate_like_dicts():
+    initial_prices = {"A": {"Austria": 10.0, "Belgium": 8.0}}
+    volume_dicts = {"A": {"Austria": {m: 100 + m for m in range(25)}, "Belgium": {m: 50 for m in range(25)}}}
+    policies = {"Austria": {"basket": ["Belgium"], "rule": "min", "frequency": 12, "enforcement_delay": 0}}
+    dataset = dataset_from_dicts(initial_prices, volume_dicts, policies, years=2)
+    assert dataset_prices(dataset) == initial_prices
+    assert dict(dataset_volumes(dataset)["A"]["Austria"]) == volume_dicts["A"]["Austria"]
+    for engine in ("dict", "numpy"):
+        expected = run_irp_simulation_with_interventions(initial_prices, volume_dicts, policies, years=2, engine=engine)
+        actual = run_irp_simulation_with_interventions(
+            dataset_prices(dataset), dataset_volumes(dataset), policies, years=2, engine=engine
+        )
+        pd.testing.assert_frame_equal(actual, expected)
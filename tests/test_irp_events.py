@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+from benchmarks.synthetic import generate_portfolio
+from irp_events import EventLog, format_price, with_rationale
+from simulator import run_irp_simulation_with_interventions
+
+
+@pytest.mark.parametrize("engine", ["dict", "numpy"])
+@pytest.mark.parametrize("seed", range(2))
+def test_lazy_rationale_matches_eager_rationale(engine, seed):
+    portfolio = generate_portfolio(drugs=2, countries=30, years=4, basket_density=0.2, interventions=8, seed=seed)
+    args = (portfolio.initial_prices, portfolio.volumes, portfolio.irp_policies, portfolio.interventions)
+    eager = run_irp_simulation_with_interventions(*args, years=portfolio.years, engine=engine)
+    event_log = EventLog()
+    lazy = run_irp_simulation_with_interventions(
+        *args, years=portfolio.years, engine=engine, rationale=False, event_log=event_log
+    )
+    assert "Rationale" not in lazy
+    pd.testing.assert_frame_equal(with_rationale(lazy, event_log), eager)
+
+
+def test_lazy_rationale_of_a_baseline_reuse():
+    # The app builds both rationale columns from logs of rationale=False runs
+    portfolio = generate_portfolio(drugs=2, countries=30, years=4, basket_density=0.2, interventions=8, seed=3)
+    args = (portfolio.initial_prices, portfolio.volumes, portfolio.irp_policies)
+    baseline_events, scenario_events = EventLog(), EventLog()
+    baseline = run_irp_simulation_with_interventions(
+        *args, [], years=portfolio.years, engine="numpy", rationale=False, event_log=baseline_events
+    )
+    scenario = run_irp_simulation_with_interventions(
+        *args, portfolio.interventions, years=portfolio.years, engine="numpy", baseline=baseline,
+        rationale=False, event_log=scenario_events, baseline_events=baseline_events
+    )
+    eager = run_irp_simulation_with_interventions(*args, portfolio.interventions, years=portfolio.years, engine="dict")
+    lazy = with_rationale(scenario, scenario_events)
+    key = ["Drug", "Country", "Year", "Month"]
+    lazy = lazy.astype({"Drug": str, "Country": str}).sort_values(key, ignore_index=True)
+    eager = eager.astype({"Drug": str, "Country": str}).sort_values(key, ignore_index=True)
+    pd.testing.assert_series_equal(lazy["Rationale"], eager["Rationale"])
+
+
+def test_format_price():
+    assert format_price(None) == "N/A"
+    assert format_price(float("nan")) == "N/A"
+    assert format_price(12) == "12.0"
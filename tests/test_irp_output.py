@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.synthetic import generate_portfolio
+from irp_output import align_results, comparison_cube, comparison_frame, month_dates
+from simulator import run_irp_simulation_with_interventions
+
+KEYS = ["Drug", "Country", "Year", "Month"]
+
+
+@pytest.fixture(scope="module")
+def results():
+    portfolio = generate_portfolio(drugs=3, countries=12, years=2, basket_density=0.3, interventions=5, seed=17)
+    args = (portfolio.initial_prices, portfolio.volumes, portfolio.irp_policies)
+    baseline = run_irp_simulation_with_interventions(*args, years=portfolio.years)
+    scenario = run_irp_simulation_with_interventions(*args, portfolio.interventions, years=portfolio.years)
+    return baseline, scenario
+
+
+def merged(baseline_df, scenario_df):
+    # The results table as the app used to build it
+    frame = pd.merge(
+        scenario_df.astype({"Drug": object, "Country": object}),
+        baseline_df.astype({"Drug": object, "Country": object}),
+        on=KEYS,
+        suffixes=("_Scenario", "_Baseline")
+    )
+    frame["Revenue_Diff"] = frame["Revenue_Baseline"] - frame["Revenue_Scenario"]
+    return frame
+
+
+def assert_cube_matches_groupby(cube, frame):
+    revenue = ["Revenue_Baseline", "Revenue_Scenario"]
+    country = frame.groupby("Country")[revenue].sum()
+    country["Impacted"] = country["Revenue_Scenario"] < country["Revenue_Baseline"]
+    pd.testing.assert_frame_equal(cube.country[revenue + ["Impacted"]], country)
+    np.testing.assert_allclose(cube.country["Revenue_Diff"], country["Revenue_Baseline"] - country["Revenue_Scenario"])
+
+    country_year = frame.groupby(["Country", "Year"])[revenue].sum()
+    np.testing.assert_allclose(cube.country_year.loc[country_year.index, revenue], country_year)
+
+    by_month = frame.groupby(["Year", "Month", "Country"])[revenue].sum().reset_index()
+    by_month["Date"] = pd.to_datetime(by_month["Year"].astype(str) + "-" + by_month["Month"].astype(str) + "-01")
+    by_month = by_month.set_index(["Country", "Date"]).sort_index()
+    cube_month = cube.country_month.loc[by_month.index]
+    np.testing.assert_allclose(cube_month[revenue], by_month[revenue])
+    assert cube_month[["Year", "Month"]].values.tolist() == by_month[["Year", "Month"]].values.tolist()
+    # Countries without rows in a month read zero in the cube
+    assert cube.country_month.drop(by_month.index)[revenue].eq(0).all().all()
+
+
+def test_cube_matches_merge_and_groupby(results):
+    baseline, scenario = results
+    cube = comparison_cube(baseline, scenario)
+    assert_cube_matches_groupby(cube, merged(baseline, scenario))
+    assert cube.country["Impacted"].any()
+    assert list(cube.dates) == sorted(set(cube.country_month.index.get_level_values("Date")))
+
+
+def test_cube_of_results_with_different_layouts(results):
+    baseline, scenario = results
+    # Shuffled scenario rows missing one country and one month of another
+    countries = scenario["Country"].astype(str)
+    dropped = countries.eq(countries.iloc[0]) | (countries.eq(countries.iloc[-1]) & scenario["Month"].eq(6))
+    scenario = scenario[~dropped].sample(frac=1, random_state=3).astype({"Drug": object, "Country": object})
+    baseline_rows, scenario_rows = align_results(baseline, scenario)
+    assert len(baseline_rows) == len(scenario)
+    pd.testing.assert_frame_equal(
+        baseline[KEYS].astype({"Drug": object, "Country": object}).iloc[baseline_rows].reset_index(drop=True),
+        scenario[KEYS].iloc[scenario_rows].reset_index(drop=True)
+    )
+    assert_cube_matches_groupby(comparison_cube(baseline, scenario), merged(baseline, scenario))
+
+
+def test_comparison_frame_matches_merge(results):
+    baseline, scenario = results
+    frame = comparison_frame(baseline, scenario)
+    expected = merged(baseline, scenario)
+    assert list(frame.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(frame.astype({"Drug": object, "Country": object}), expected)
+
+
+def test_month_dates():
+    dates = month_dates([2025, 2025, 2031], [1, 12, 7])
+    assert [d.strftime("%Y-%m-%d") for d in dates] == ["2025-01-01", "2025-12-01", "2031-07-01"]
@@ -0,0 +1,62 @@
+from irp_schedule import build_month_map, compile_irp_schedule
+
+# 2025-01 to 2027-01
+MONTH_MAP = build_month_map(2, 2025)
+
+
+def policy(**fields):
+    return dict({"basket": ["Belgium"], "rule": "average", "frequency": 12, "enforcement_delay": 0}, **fields)
+
+
+def test_countries_without_reviews_are_dropped():
+    schedule = compile_irp_schedule(
+        {
+            "Austria": policy(),
+            "Belgium": policy(performs_irp=False),
+            "Croatia": policy(basket=[]),
+            "Denmark": policy(rule="mode"),
+        },
+        MONTH_MAP
+    )
+    assert {event.country for event in schedule} == {"Austria"}
+
+
+def test_reviews_anchor_on_review_month():
+    schedule = compile_irp_schedule({"Austria": policy(review_month=3, enforcement_delay=2)}, MONTH_MAP)
+    assert [(event.collected_at, event.month) for event in schedule] == [(2, 4), (14, 16)]
+    assert [MONTH_MAP[event.collected_at] for event in schedule] == [(2025, 3), (2026, 3)]
+
+
+def test_reviews_without_review_month_start_at_month_zero():
+    # The collection at month 0 with no delay has nothing to enforce
+    schedule = compile_irp_schedule({"Austria": policy(frequency=6)}, MONTH_MAP)
+    assert [event.month for event in schedule] == [6, 12, 18, 24]
+
+
+def test_schedule_is_sorted_by_month_level_and_country():
+    # Austria and Belgium reference each other and share a level; Croatia
+    # references Belgium and comes after both
+    schedule = compile_irp_schedule(
+        {"Croatia": policy(frequency=6), "Austria": policy(), "Belgium": policy(basket=["Austria"], frequency=4)},
+        MONTH_MAP
+    )
+    keys = [(event.month, event.level, event.country) for event in schedule]
+    assert keys == sorted(keys)
+    assert [event.country for event in schedule if event.month == 12] == ["Austria", "Belgium", "Croatia"]
+    assert [event.level for event in schedule if event.month == 12] == [0, 0, 1]
+
+
+def test_indexed_schedule_keeps_known_basket_members():
+    schedule = compile_irp_schedule(
+        {"Austria": policy(basket=["Belgium", "Atlantis"]), "Croatia": policy(basket=["Atlantis"])},
+        MONTH_MAP,
+        {"Austria": 0, "Belgium": 1, "Croatia": 2}
+    )
+    assert {event.country for event in schedule} == {"Austria"}
+    assert all(event.basket_index == [1] and event.country_id == 0 for event in schedule)
+
+
+def test_month_map_runs_through_january_after_the_last_year():
+    month_map = build_month_map(2, 2030)
+    assert len(month_map) == 25
+    assert month_map[0] == (2030, 1) and month_map[11] == (2030, 12) and month_map[-1] == (2032, 1)
@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+from benchmarks.synthetic import generate_portfolio
+from irp_schedule import dependent_countries
+import launch_optimizer
+from launch_optimizer import _country_revenue, _evaluate_chunk, _simulate_plans, optimize_launch_corridor
+from vectorized_simulator import prepare_simulation, volume_cube
+
+DRUG = "Drug 1"
+
+
+@pytest.fixture(scope="module")
+def portfolio():
+    return generate_portfolio(drugs=1, countries=15, years=4, basket_density=0.3, interventions=0, seed=21)
+
+
+@pytest.fixture(scope="module")
+def search(portfolio):
+    countries = list(portfolio.initial_prices[DRUG])
+    windows = {country: ((2025, 1), (2026, 6)) for country in countries[::4]}
+    result = optimize_launch_corridor(
+        portfolio.initial_prices, portfolio.volumes, portfolio.irp_policies, DRUG,
+        launch_windows=windows, years=portfolio.years, refinements=1, corridor_steps=11
+    )
+    return windows, result
+
+
+def simulate(portfolio, plan, changes=None):
+    # Revenue per country of `plan`, with {country: price} changes applied
+    setup = prepare_simulation(portfolio.initial_prices, portfolio.irp_policies, None, portfolio.years, 2025)
+    d = setup.drug_index[DRUG]
+    prices = setup.initial[d, :, 0].copy()
+    launches = np.zeros(len(prices), dtype=np.int64)
+    for row in plan.itertuples():
+        c = setup.registry[row.Country]
+        prices[c] = (changes or {}).get(row.Country, row.Launch_Price)
+        launches[c] = setup.month_map.index((row.Launch_Year, row.Launch_Month))
+    volumes = volume_cube(setup, {DRUG: portfolio.volumes[DRUG]})[d]
+    revenue = _country_revenue(_simulate_plans(setup, d, [(prices, launches)])[0], volumes)
+    return {country: revenue[setup.registry[country]] for country in plan["Country"]}
+
+
+def test_plan_revenue_matches_a_direct_simulation(portfolio, search):
+    _, result = search
+    revenue = simulate(portfolio, result.plan)
+    np.testing.assert_allclose(result.plan["Revenue"], [revenue[c] for c in result.plan["Country"]])
+    assert result.revenue == pytest.approx(sum(revenue.values()))
+    assert result.revenue >= result.start_revenue
+
+
+def test_plan_respects_bounds_and_windows(portfolio, search):
+    windows, result = search
+    plan = result.plan.set_index("Country")
+    initial = portfolio.initial_prices[DRUG]
+    for country, row in plan.iterrows():
+        low, high = initial[country] * 0.7, initial[country] * 1.3
+        assert round(low, 2) <= row.Launch_Price <= round(high, 2)
+        assert round(low, 2) <= row.Corridor_Low <= row.Launch_Price <= row.Corridor_High <= round(high, 2)
+        if country in windows:
+            assert (2025, 1) <= (row.Launch_Year, row.Launch_Month) <= (2026, 6)
+        else:
+            assert (row.Launch_Year, row.Launch_Month) == (2025, 1)
+
+
+def test_corridor_bounds_stay_above_the_floor(portfolio, search):
+    _, result = search
+    floor = result.revenue * (1 - 0.01)
+    for row in result.plan.itertuples():
+        for price in (row.Corridor_Low, row.Corridor_High):
+            assert sum(simulate(portfolio, result.plan, {row.Country: price}).values()) >= floor - 1e-6
+
+
+def test_restricted_evaluation_matches_full_simulation(portfolio):
+    setup = prepare_simulation(portfolio.initial_prices, portfolio.irp_policies, None, portfolio.years, 2025)
+    d = setup.drug_index[DRUG]
+    volumes = volume_cube(setup, {DRUG: portfolio.volumes[DRUG]})[d]
+    prices = setup.initial[d, :, 0].copy()
+    launches = np.zeros(len(prices), dtype=np.int64)
+    launches[[1, 4]] = [7, 13]
+    incumbent = _simulate_plans(setup, d, [(prices, launches)])[0]
+    downstream = {c: np.array(sorted(dependent_countries(setup.schedule, {c}))) for c in range(len(prices))}
+    tasks = [(c, [(round(prices[c] * f, 2), m) for f in (0.8, 1.1) for m in (0, 5)]) for c in (0, 1, 6)]
+    state = {"setup": setup, "d": d, "volumes": volumes, "downstream": downstream}
+    restricted = iter(_evaluate_chunk(state, (incumbent, prices, launches, tasks)))
+    base = _country_revenue(incumbent, volumes)
+    for c, candidates in tasks:
+        for price, month in candidates:
+            plan_prices, plan_launches = prices.copy(), launches.copy()
+            plan_prices[c], plan_launches[c] = price, month
+            full = _country_revenue(_simulate_plans(setup, d, [(plan_prices, plan_launches)])[0], volumes)
+            assert full.sum() == pytest.approx(base.sum() - base[downstream[c]].sum() + next(restricted))
+
+
+def test_worker_processes_give_the_same_plan(portfolio, monkeypatch):
+    args = (portfolio.initial_prices, portfolio.volumes, portfolio.irp_policies, DRUG)
+    kwargs = {"years": portfolio.years, "refinements": 0, "corridor_steps": 5, "max_rounds": 2}
+    serial = optimize_launch_corridor(*args, processes=1, **kwargs)
+    monkeypatch.setattr(launch_optimizer, "PARALLEL_MIN_ROWS", 1)
+    pooled = optimize_launch_corridor(*args, processes=2, **kwargs)
+    assert serial.plan.equals(pooled.plan)
+    assert (serial.revenue, serial.evaluations) == (pooled.revenue, pooled.evaluations)
+
+
+def test_invalid_searches_are_rejected(portfolio):
+    args = (portfolio.initial_prices, portfolio.volumes, portfolio.irp_policies)
+    with pytest.raises(ValueError, match="Unknown drug 'Nothing'"):
+        optimize_launch_corridor(*args, "Nothing", years=portfolio.years)
+    with pytest.raises(ValueError) as error:
+        optimize_launch_corridor(
+            *args, DRUG, years=portfolio.years,
+            price_bounds={"Atlantis": (1, 2), "Austria": (5, 1)},
+            launch_windows={"Belgium": ((2030, 1), (2030, 2))}
+        )
+    message = str(error.value)
+    assert "'Atlantis' has no price for 'Drug 1'" in message
+    assert "Price bounds of 'Austria' must satisfy 0 <= low <= high" in message
+    assert "Launch window of 'Belgium' is outside the simulated horizon" in message
+    with pytest.raises(ValueError, match="at least 2"):
+        optimize_launch_corridor(*args, DRUG, price_steps=1)
@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.synthetic import generate_portfolio
+import portfolio as portfolio_module
+from portfolio import drug_policies, portfolio_tasks, run_portfolio
+from simulator import run_irp_simulation_with_interventions
+
+YEARS = 3
+
+
+@pytest.fixture(scope="module")
+def inputs():
+    synthetic = generate_portfolio(drugs=5, countries=20, years=YEARS, basket_density=0.2, interventions=6, seed=31)
+    drugs = {
+        drug: {"prices": synthetic.initial_prices[drug], "volumes": synthetic.volumes[drug]}
+        for drug in synthetic.initial_prices
+    }
+    # One drug reviews under its own rule in one country
+    country = next(iter(synthetic.irp_policies))
+    drugs["Drug 2"]["policies"] = {country: {"rule": "min", "allow_increase": True}}
+    return drugs, synthetic.irp_policies, synthetic.interventions
+
+
+def single_runs(drugs, irp_policies, interventions):
+    # Each drug simulated on its own, with its own policies
+    frames = {}
+    for drug, inputs in drugs.items():
+        frame = run_irp_simulation_with_interventions(
+            {drug: inputs["prices"]},
+            {drug: inputs["volumes"]},
+            drug_policies(irp_policies, inputs.get("policies")),
+            [event for event in interventions if event["drug"] == drug],
+            years=YEARS,
+            rationale=False
+        )
+        frames[drug] = frame.astype({"Drug": str, "Country": str})
+    return frames
+
+
+def test_totals_match_single_drug_runs(inputs):
+    drugs, irp_policies, interventions = inputs
+    result = run_portfolio(drugs, irp_policies, interventions, years=YEARS, keep_frames=True)
+    frames = single_runs(drugs, irp_policies, interventions)
+    combined = pd.concat(frames.values(), ignore_index=True)
+
+    summary = result.summary.set_index("Drug")
+    revenue = combined.groupby("Drug")["Revenue"].sum()
+    np.testing.assert_allclose(summary.loc[revenue.index, "Revenue"], revenue)
+    by_country = result.by_country.set_index("Country")
+    revenue = combined.groupby("Country")["Revenue"].sum()
+    np.testing.assert_allclose(by_country.loc[revenue.index, "Revenue"], revenue)
+    assert by_country["Drugs"].to_dict() == combined.groupby("Country")["Drug"].nunique().to_dict()
+    revenue = combined.groupby(["Year", "Month"])["Revenue"].sum()
+    np.testing.assert_allclose(result.by_month.set_index(["Year", "Month"]).loc[revenue.index, "Revenue"], revenue)
+    assert result.by_month[["Year", "Month"]].iloc[[0, -1]].values.tolist() == [[2025, 1], [2028, 1]]
+    for drug, frame in frames.items():
+        kept = result.frames[drug].astype({"Drug": str, "Country": str})
+        pd.testing.assert_frame_equal(kept, frame)
+
+
+def test_exposure_is_taken_off_flat_launch_prices(inputs):
+    drugs, irp_policies, interventions = inputs
+    result = run_portfolio(drugs, irp_policies, interventions, years=YEARS)
+    for frame in (result.summary, result.by_country, result.by_month):
+        np.testing.assert_allclose(frame["Exposure"], frame["Revenue_No_IRP"] - frame["Revenue"])
+    drug = "Drug 1"
+    volumes = drugs[drug]["volumes"]
+    flat = sum(
+        round(price * volumes.get(country, {}).get(m, 0), 2)
+        for country, price in drugs[drug]["prices"].items()
+        for m in range(YEARS * 12 + 1)
+    )
+    summary = result.summary.set_index("Drug")
+    assert summary.loc[drug, "Revenue_No_IRP"] == pytest.approx(flat)
+    assert result.summary["Exposure"].is_monotonic_decreasing
+
+
+def test_on_drug_reports_every_drug_once(inputs):
+    drugs, irp_policies, _ = inputs
+    seen = []
+    run_portfolio(drugs, irp_policies, years=YEARS, on_drug=lambda totals, done, total: seen.append((totals.drug, done, total)))
+    assert sorted(drug for drug, _, _ in seen) == sorted(drugs)
+    assert [(done, total) for _, done, total in seen] == [(i + 1, len(drugs)) for i in range(len(drugs))]
+
+
+def test_worker_processes_give_the_same_totals(inputs, monkeypatch):
+    drugs, irp_policies, interventions = inputs
+    serial = run_portfolio(drugs, irp_policies, interventions, years=YEARS, processes=1)
+    monkeypatch.setattr(portfolio_module, "PARALLEL_MIN_DRUGS", 1)
+    pooled = run_portfolio(drugs, irp_policies, interventions, years=YEARS, processes=2)
+    pd.testing.assert_frame_equal(serial.summary, pooled.summary)
+    pd.testing.assert_frame_equal(serial.by_month, pooled.by_month)
+    pd.testing.assert_frame_equal(
+        serial.by_country.sort_values("Country", ignore_index=True), pooled.by_country.sort_values("Country", ignore_index=True)
+    )
+
+
+def test_tasks_group_drugs_by_policies(inputs):
+    drugs, irp_policies, interventions = inputs
+    tasks = portfolio_tasks(drugs, irp_policies, interventions, drugs_per_task=2)
+    assert sorted(len(task[0]) for task in tasks) == [1, 2, 2]
+    assert [task[0] for task in tasks if task[3] is not irp_policies] == [["Drug 2"]]
+    for task in tasks:
+        assert all(event["drug"] in task[0] for event in task[4])
+
+
+def test_drug_policies_override_field_by_field():
+    policies = {"Austria": {"basket": ["Belgium"], "rule": "average"}}
+    assert drug_policies(policies, None) is policies
+    assert drug_policies(policies, {"Austria": {"rule": "min"}, "Belgium": {"basket": []}}) == {
+        "Austria": {"basket": ["Belgium"], "rule": "min"},
+        "Belgium": {"basket": []},
+    }
+
+
+def test_interventions_for_unknown_drugs_are_rejected(inputs):
+    drugs, irp_policies, _ = inputs
+    with pytest.raises(ValueError, match="unknown drug 'Nothing'"):
+        run_portfolio(drugs, irp_policies, [{"drug": "Nothing"}], years=YEARS)
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from benchmarks.synthetic import generate_portfolio
+from price_series import ChangePointSeries, calendar_prices, calendar_steps, series_from_array
+from simulator import run_irp_simulation_with_interventions
+
+
+def test_prices_carry_forward_between_change_points():
+    series = ChangePointSeries(10.0)
+    series[5] = 8.0
+    series[9] = 8.0
+    assert series.change_points() == [(0, 10.0), (5, 8.0)]
+    assert [series.get(m) for m in (0, 4, 5, 100)] == [10.0, 10.0, 8.0, 8.0]
+    assert 3 in series and series[7] == 8.0
+
+
+def test_reads_before_the_first_change_point():
+    series = ChangePointSeries(10.0, start=3)
+    assert series.get(2) is None and 2 not in series
+    with pytest.raises(KeyError):
+        series[2]
+    empty = ChangePointSeries()
+    assert not empty and len(empty) == 0 and empty.get(0) is None
+
+
+def test_rewriting_the_last_change_point():
+    series = ChangePointSeries(10.0)
+    series[4] = 8.0
+    series[4] = 7.0
+    assert series.change_points() == [(0, 10.0), (4, 7.0)]
+    # Writing back the previous price removes the change point
+    series[4] = 10.0
+    assert series.change_points() == [(0, 10.0)]
+
+
+def test_writes_in_the_middle_of_a_series():
+    series = ChangePointSeries(10.0)
+    series[6] = 6.0
+    series[3] = 8.0
+    assert series.change_points() == [(0, 10.0), (3, 8.0), (6, 6.0)]
+    series[3] = 9.0
+    series[0] = 11.0
+    assert series.change_points() == [(0, 11.0), (3, 9.0), (6, 6.0)]
+    assert [series.get(m) for m in range(8)] == [11.0, 11.0, 11.0, 9.0, 9.0, 9.0, 6.0, 6.0]
+
+
+def test_sample_and_dense_arrays():
+    series = ChangePointSeries(10.0, start=2)
+    series[5] = 8.0
+    np.testing.assert_array_equal(series.sample([0, 2, 4, 5, 20]), [np.nan, 10.0, 10.0, 8.0, 8.0])
+    np.testing.assert_array_equal(series.to_array(7), [np.nan, np.nan, 10.0, 10.0, 10.0, 8.0, 8.0])
+
+
+def test_series_from_array_round_trip():
+    values = np.array([np.nan, np.nan, 10.0, 10.0, 8.0, 8.0, 8.0, 10.0])
+    series = series_from_array(values)
+    assert series.change_points() == [(2, 10.0), (4, 8.0), (7, 10.0)]
+    np.testing.assert_array_equal(series.to_array(len(values)), values)
+    assert not series_from_array([np.nan, np.nan])
+
+
+def test_calendar_grid_uses_the_month_in_force():
+    dates, positions = calendar_steps(2025, 1, "week")
+    assert dates[0].strftime("%Y-%m-%d") == "2025-01-01" and dates[-1].year == 2025
+    assert positions[dates.month == 3].tolist() == [2] * int((dates.month == 3).sum())
+    series = ChangePointSeries(10.0)
+    series[2] = 8.0
+    frame = calendar_prices({("D", "Austria"): series}, 2025, 1, "day")
+    assert len(frame) == 366
+    march = frame["Date"].dt.month == 3
+    assert (frame.loc[march, "Price"] == 8.0).all() and (frame.loc[frame["Date"].dt.month == 2, "Price"] == 10.0).all()
+    with pytest.raises(ValueError, match="Unknown step"):
+        calendar_steps(2025, 1, "hour")
+
+
+def test_engines_fill_the_same_change_points():
+    portfolio = generate_portfolio(drugs=2, countries=25, years=5, basket_density=0.2, interventions=6, seed=5)
+    change_points = {}
+    for engine in ("dict", "numpy"):
+        change_points[engine] = {}
+        result = run_irp_simulation_with_interventions(
+            portfolio.initial_prices, portfolio.volumes, portfolio.irp_policies, portfolio.interventions,
+            years=portfolio.years, engine=engine, change_points=change_points[engine]
+        )
+    assert change_points["dict"].keys() == change_points["numpy"].keys()
+    for key, series in change_points["dict"].items():
+        assert series.change_points() == change_points["numpy"][key].change_points(), key
+    rows = result.astype({"Drug": str, "Country": str}).groupby(["Drug", "Country"], sort=False)["Price"]
+    for (drug, country), row in rows:
+        np.testing.assert_array_equal(change_points["numpy"][(drug, country)].to_array(len(row)), row.to_numpy())
@@ -0,0 +1,105 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from result_cache import ResultCache, entry_size, input_key
+
+
+def test_input_key_does_not_depend_on_dict_order():
+    policies = {"Austria": {"basket": ["Belgium"], "rule": "min"}, "Belgium": {"rule": "average", "basket": []}}
+    reordered = {"Belgium": {"basket": [], "rule": "average"}, "Austria": {"rule": "min", "basket": ["Belgium"]}}
+    assert input_key(policies, {"years": 10}) == input_key(reordered, {"years": 10})
+
+
+@pytest.mark.parametrize("a, b", [
+    (1, 1.0),
+    (1, "1"),
+    (1, True),
+    (0, None),
+    ([1, 2], [2, 1]),
+    ({"a": 1}, {"a": 1, "b": None}),
+    (np.arange(3), np.arange(3, dtype=float)),
+    (np.zeros((2, 3)), np.zeros((3, 2))),
+])
+def test_input_key_keeps_different_inputs_apart(a, b):
+    assert input_key(a) != input_key(b)
+
+
+def test_input_key_hashes_arrays_by_content():
+    assert input_key(np.arange(5.0)) == input_key(np.arange(5.0))
+    assert input_key(np.arange(5.0)) != input_key(np.arange(5.0) + 1)
+    assert input_key(np.float64(2.5)) == input_key(2.5)
+
+
+def test_input_key_rejects_unknown_types():
+    with pytest.raises(TypeError, match="Cannot hash object"):
+        input_key(object())
+
+
+def test_least_recently_used_entries_go_first():
+    cache = ResultCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.get("b") is None
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_entries_are_evicted_by_size():
+    array = np.zeros(1000)
+    cache = ResultCache(max_bytes=2 * array.nbytes)
+    cache.put("a", array)
+    cache.put("b", array.copy())
+    assert cache.size_bytes == 2 * array.nbytes
+    cache.put("c", array.copy())
+    assert len(cache) == 2 and "a" not in cache
+    assert cache.size_bytes == 2 * array.nbytes
+    # Entries larger than the whole cache are not kept
+    cache.put("d", np.zeros(3000))
+    assert "d" not in cache and len(cache) == 2
+
+
+def test_entry_size_of_results():
+    frame = pd.DataFrame({"Price": np.zeros(100)})
+    assert entry_size((frame, np.zeros(10))) == frame.memory_usage(deep=True).sum() + 80
+
+
+def test_get_or_compute_runs_compute_once():
+    cache = ResultCache()
+    calls = []
+
+    def compute():
+        calls.append(True)
+        return "result"
+
+    assert cache.get_or_compute("key", compute) == "result"
+    assert cache.get_or_compute("key", compute) == "result"
+    assert len(calls) == 1
+
+
+def test_disk_entries_outlive_the_cache(tmp_path):
+    ResultCache(directory=str(tmp_path)).put("key", {"value": 1})
+    cache = ResultCache(directory=str(tmp_path))
+    assert "key" in cache
+    assert cache.get("key") == {"value": 1}
+    assert cache.disk_hits == 1
+    assert cache.get("key") == {"value": 1}
+    assert cache.hits == 1
+
+
+def test_disk_is_trimmed_oldest_read_first(tmp_path):
+    array = np.zeros(1000)
+    writer = ResultCache(directory=str(tmp_path), max_disk_bytes=10 ** 9)
+    writer.put("a", array)
+    writer.put("b", array)
+    size = os.path.getsize(tmp_path / "a.pkl")
+    os.utime(tmp_path / "a.pkl", (1000, 1000))
+    os.utime(tmp_path / "b.pkl", (2000, 2000))
+    # Reading "a" from disk makes it the most recently used file
+    reader = ResultCache(directory=str(tmp_path), max_disk_bytes=2 * size + size // 2)
+    assert reader.get("a") is not None
+    reader.put("c", array)
+    assert sorted(os.listdir(tmp_path)) == ["a.pkl", "c.pkl"]
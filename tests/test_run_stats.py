@@ -0,0 +1,59 @@
+import pytest
+from run_stats import SimulationStats
+from simulator import run_irp_simulation_with_interventions
+
+
+def policy(basket, **fields):
+    return dict({"basket": basket, "rule": "min", "frequency": 12, "enforcement_delay": 0}, **fields)
+
+
+def run_stats(initial_prices, irp_policies, interventions, years, engine):
+    stats = SimulationStats()
+    run_irp_simulation_with_interventions(initial_prices, {}, irp_policies, interventions, years=years, engine=engine, stats=stats)
+    return stats.counters()
+
+
+@pytest.mark.parametrize("engine", ["dict", "numpy"])
+def test_reviews_that_keep_the_price_are_not_changes(engine):
+    # Austria reviews monthly and may increase, but its basket holds its own
+    # price: every review is logged and none moves the price
+    counters = run_stats(
+        {"D": {"Austria": 10.0, "Belgium": 10.0}},
+        {"Austria": policy(["Belgium"], rule="average", frequency=1, allow_increase=True)},
+        [],
+        2,
+        engine
+    )
+    assert counters["price_changes"] == 0
+    assert counters["change_rate"] == 0.0
+    assert counters["irp_evaluations"] == 1
+    assert counters["stopped_month"] == 1
+
+
+@pytest.mark.parametrize("engine", ["dict", "numpy"])
+def test_counters_of_a_hand_built_run(engine):
+    # Belgium is cut to 6 in June 2025; Austria follows at its January 2026
+    # review, and its January 2027 review finds nothing lower
+    counters = run_stats(
+        {"D": {"Austria": 10.0, "Belgium": 8.0}, "E": {"Austria": 5.0, "Belgium": 8.0}},
+        {"Austria": policy(["Belgium"]), "Belgium": policy([], performs_irp=False)},
+        [{"drug": "D", "country": "Belgium", "year": 2025, "month": 6, "mode": "absolute", "value": 6}],
+        2,
+        engine
+    )
+    assert {key: counters[key] for key in (
+        "series", "months", "irp_evaluations", "price_changes", "interventions_applied",
+        "mean_basket_size", "largest_basket", "output_rows", "converged_month", "stopped_month"
+    )} == {
+        "series": 4,
+        "months": 25,
+        "irp_evaluations": 4,
+        "price_changes": 1,
+        "interventions_applied": 1,
+        "mean_basket_size": 1.0,
+        "largest_basket": 1,
+        "output_rows": 100,
+        "converged_month": None,
+        "stopped_month": None,
+    }
+    assert counters["change_rate"] == 0.25
@@ -0,0 +1,465 @@
+import time
+import warnings
+from collections import namedtuple
+import numpy as np
+from country_registry import resolve_policies_for_prices
+from irp_data import series_values
+from irp_events import EventLog
+from irp_output import assemble_result_frame
+from interventions import index_by_month, validate_interventions
+from irp_schedule import (
+    SteadyState, build_month_map, compile_irp_schedule, dependent_countries, group_by_level, group_by_month
+)
+from price_series import series_from_array
+from run_stats import timed
+
+
+def _reduce_basket(values, rule):
+    # values: (..., basket) in basket order, NaN for members without a price
+    if rule == "average":
+        # Accumulate member by member like sum() does: prices carry two
+        # decimals, so pairwise summation would flip round(..., 2) on ties.
+        valid = ~np.isnan(values)
+        total = np.zeros(values.shape[:-1])
+        for k in range(values.shape[-1]):
+            total = total + np.where(valid[..., k], values[..., k], 0.0)
+        count = valid.sum(axis=-1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(count > 0, total / count, np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        if rule == "min":
+            return np.nanmin(values, axis=-1)
+        elif rule == "median":
+            return np.nanmedian(values, axis=-1)
+    return np.full(values.shape[:-1], np.nan)
+
+
+def build_reference_matrix(irp_policies, country_index):
+    # One row per policy in irp_policies order holding the basket's country
+    # indices in basket order, padded with -1 (unknown names are dropped).
+    rows = [
+        [country_index[c] for c in policy.get("basket", []) if c in country_index]
+        for policy in irp_policies.values()
+    ]
+    width = max((len(r) for r in rows), default=0)
+    reference = np.full((len(rows), max(width, 1)), -1, dtype=np.int64)
+    for i, r in enumerate(rows):
+        reference[i, :len(r)] = r
+    return reference
+
+
+def gather_basket_prices(month_prices, reference_rows):
+    # month_prices: (drugs, countries) -> (drugs, rows, basket width)
+    values = month_prices[:, np.maximum(reference_rows, 0)]
+    return np.where(reference_rows >= 0, values, np.nan)
+
+
+SimulationSetup = namedtuple(
+    "SimulationSetup",
+    [
+        "drugs", "drug_index", "registry", "irp_policies", "month_map", "start_year",
+        "initial", "reference", "schedule", "events_by_month", "interventions_by_month"
+    ]
+)
+
+
+def prepare_simulation(initial_prices, irp_policies, interventions=None, years=10, start_year=2025):
+    drugs = list(initial_prices)
+    drug_index = {d: i for i, d in enumerate(drugs)}
+    registry, irp_policies, _ = resolve_policies_for_prices(irp_policies, initial_prices)
+
+    total_months = years * 12
+    month_map = build_month_map(years, start_year)
+
+    # drug x country x month, NaN where a drug is not priced in a country
+    initial = np.full((len(drugs), len(registry), total_months + 1), np.nan)
+    for d, drug in enumerate(drugs):
+        for country, price in initial_prices[drug].items():
+            initial[d, registry[country], 0] = price
+
+    reference = build_reference_matrix(irp_policies, registry)
+    schedule = compile_irp_schedule(irp_policies, month_map, registry)
+
+    setup = SimulationSetup(
+        drugs, drug_index, registry, irp_policies, month_map, start_year,
+        initial, reference, schedule, group_by_month(schedule), {}
+    )
+    return setup._replace(interventions_by_month=index_interventions(setup, interventions))
+
+
+def index_interventions(setup, interventions):
+    # {month index: [(drug index, Intervention)]} in list order. Raises
+    # ValueError for unknown drugs or countries and out-of-horizon dates.
+    priced = {drug: set(np.flatnonzero(~np.isnan(setup.initial[d, :, 0])).tolist()) for d, drug in enumerate(setup.drugs)}
+    validated = validate_interventions(interventions, priced, setup.registry, setup.month_map)
+    return {
+        m: [(setup.drug_index[event.drug], event) for event in due]
+        for m, due in index_by_month(validated).items()
+    }
+
+
+def volume_cube(setup, volumes):
+    cube = np.zeros(setup.initial.shape)
+    months = len(setup.month_map)
+    for d, drug in enumerate(setup.drugs):
+        for country, series in volumes.get(drug, {}).items():
+            c = setup.registry.resolve(country)
+            if c is not None:
+                cube[d, c] = series_values(series, months)
+    return cube
+
+
+def run_months(setup, prices, event_log, row_keys, interventions_by_month, first_month=0, countries=None, stats=None):
+    # Advances `prices` (rows x countries x months) from first_month to the
+    # horizon. interventions_by_month holds (row, event) pairs. Applied events
+    # are logged with row_keys[row] as drug and the country index as country;
+    # pass event_log=None to skip logging. When `countries` is given, only
+    # those country indices are carried forward and reviewed; the other
+    # columns must already hold their final prices. Phase times and IRP
+    # evaluations go to `stats` when given. A full run (countries=None) stops
+    # reviewing once prices have settled and returns the month index from
+    # which they stay fixed; otherwise it returns None.
+    registry, reference = setup.registry, setup.reference
+    columns = slice(None) if countries is None else np.asarray(sorted(countries), dtype=np.int64)
+    events_by_month = setup.events_by_month
+    if countries is not None:
+        events_by_month = {
+            m: [e for e in due if e.country_id in countries]
+            for m, due in events_by_month.items()
+        }
+    months = {m for m, due in events_by_month.items() if due} | set(interventions_by_month)
+    months = sorted(m for m in months if m >= first_month)
+
+    # Only months with a review or an intervention are visited; the months in
+    # between are pure carry-forward and are filled in one slice assignment.
+    timing = stats is not None
+    clock = time.perf_counter
+    carry_seconds = intervention_seconds = irp_seconds = 0.0
+    # Restricted runs read columns that keep changing, so they cannot settle
+    steady = None
+    if countries is None:
+        steady = SteadyState(setup.schedule, max(interventions_by_month, default=-1))
+    stopped_at = None
+    horizon = len(setup.month_map) - 1
+    if steady is not None and not months and horizon > 0:
+        # No reviews and no interventions: prices are fixed from month 0, as
+        # the dict engine finds before its first month
+        stopped_at = 0
+    last = max(first_month - 1, 0)
+    for m in months:
+        if timing:
+            t0 = clock()
+        prices[:, columns, last + 1:m + 1] = prices[:, columns, last, None]
+        last = m
+
+        if timing:
+            t1 = clock()
+        for row, event in interventions_by_month.get(m, []):
+            c = registry[event.country]
+            current_price = float(prices[row, c, m])
+            if event.mode == "percent":
+                new_price = round(current_price * (1 - event.value / 100), 2)
+            else:
+                new_price = round(event.value, 2)
+            if steady is not None and new_price != current_price:
+                steady.changed(m)
+            prices[row, c, m] = new_price
+            if event_log is not None:
+                event_log.record_intervention(row_keys[row], c, m, event.mode, event.value, current_price, new_price)
+
+        if timing:
+            t2 = clock()
+        due = events_by_month.get(m, [])
+
+        # Reviews of one level read prices after every lower level has written
+        # and before any review of their own level does, so a level is reduced
+        # in one batch per (rule, collection month) and then written.
+        for level in group_by_level(due):
+            groups = {}
+            for event in level:
+                groups.setdefault((event.rule, event.collected_at), []).append(event.order)
+            level_prices = {}
+            for (rule, collected_at), orders in groups.items():
+                values = gather_basket_prices(prices[:, :, collected_at], reference[orders])
+                reduced = _reduce_basket(values, rule)
+                for i, order in enumerate(orders):
+                    level_prices[order] = reduced[:, i]
+
+            for event in level:
+                c = event.country_id
+                irp_price = level_prices[event.order]
+                current = prices[:, c, m]
+                changed = ~np.isnan(irp_price) & ~np.isnan(current)
+                if not event.allow_increase:
+                    changed &= irp_price < current
+                if steady is not None:
+                    steady.reviewed(event)
+                for row in np.flatnonzero(changed):
+                    new_price = round(float(irp_price[row]), 2)
+                    if steady is not None and new_price != current[row]:
+                        steady.changed(m)
+                    if event_log is not None:
+                        event_log.record_irp(
+                            row_keys[row], c, m, event.rule, event.collected_at, event.basket, float(current[row]), new_price
+                        )
+                    prices[row, c, m] = new_price
+        if timing:
+            t3 = clock()
+            carry_seconds += t1 - t0
+            intervention_seconds += t2 - t1
+            irp_seconds += t3 - t2
+            stats.count_reviews(due, prices.shape[0])
+        if steady is not None and m < horizon and steady.settled(m):
+            stopped_at = m
+            break
+
+    if timing:
+        t0 = clock()
+    prices[:, columns, last + 1:] = prices[:, columns, last, None]
+    if stopped_at is not None and event_log is not None:
+        _log_settled_reviews(setup, prices, event_log, row_keys, stopped_at)
+    if timing:
+        stats.add_time("carry_forward", carry_seconds + clock() - t0)
+        stats.add_time("interventions", intervention_seconds)
+        stats.add_time("irp", irp_seconds)
+        stats.series += int(np.count_nonzero(~np.isnan(prices[:, columns, 0])))
+        stats.months += len(setup.month_map) - first_month
+        if stopped_at is not None:
+            stats.converged_month = steady.last_change
+            stats.stopped_month = stopped_at
+    return None if stopped_at is None else steady.last_change
+
+
+def _log_settled_reviews(setup, prices, event_log, row_keys, stopped_at):
+    # Reviews after stopped_at cannot change a price, but those whose result
+    # rounds to the current price are still logged as in a full run. Prices
+    # no longer move, so each policy is reduced once.
+    settled_prices = {}
+    for event in setup.schedule:
+        if event.month <= stopped_at:
+            continue
+        if event.order not in settled_prices:
+            values = gather_basket_prices(prices[:, :, event.collected_at], setup.reference[event.order])
+            settled_prices[event.order] = _reduce_basket(values, event.rule)
+        irp_price = settled_prices[event.order]
+        c, m = event.country_id, event.month
+        current = prices[:, c, m]
+        logged = ~np.isnan(irp_price) & ~np.isnan(current)
+        if not event.allow_increase:
+            logged &= irp_price < current
+        for row in np.flatnonzero(logged):
+            event_log.record_irp(
+                row_keys[row], c, m, event.rule, event.collected_at, event.basket,
+                float(current[row]), round(float(irp_price[row]), 2)
+            )
+
+
+def rationale_texts(setup, prices, event_log):
+    # Rationale texts of a relabelled log keyed by (drug, country, month)
+    # indices. Each drug's prices become {country name: monthly prices as
+    # Python floats} once, so the lookup per basket member is two dict hits;
+    # the registry only resolves spellings not seen yet.
+    country_ids = {name: c for c, name in enumerate(setup.registry.names)}
+    drug_index = setup.drug_index
+    price_rows = {}
+
+    def country_id(name):
+        c = country_ids.get(name)
+        if c is None:
+            c = country_ids[name] = setup.registry[name]
+        return c
+
+    def price_of(drug, country, month):
+        rows = price_rows.get(drug)
+        if rows is None:
+            monthly = prices[drug_index[drug]].tolist()
+            rows = price_rows[drug] = {name: monthly[c] for name, c in country_ids.items()}
+        row = rows.get(country)
+        if row is None:
+            row = rows[country] = prices[drug_index[drug], country_id(country)].tolist()
+        return row[month]
+
+    return {
+        (drug_index[drug], country_id(country), month): text
+        for (drug, country, month), text in event_log.rationale(price_of).items()
+    }
+
+
+def assemble_frame(setup, initial_prices, volumes_cube, prices, rationale_map=None):
+    # Result frame of the priced series in `prices`; volumes_cube is
+    # volume_cube(setup, volumes)
+    drug_codes, country_codes = [], []
+    for d, drug in enumerate(setup.drugs):
+        for country in initial_prices[drug]:
+            drug_codes.append(d)
+            country_codes.append(setup.registry[country])
+    drug_codes = np.array(drug_codes, dtype=np.int64)
+    country_codes = np.array(country_codes, dtype=np.int64)
+    rationale = None
+    if rationale_map is not None:
+        row_of = {(d, c): row for row, (d, c) in enumerate(zip(drug_codes.tolist(), country_codes.tolist()))}
+        rationale = {
+            (row_of[(d, c)], m): text
+            for (d, c, m), text in rationale_map.items()
+            if (d, c) in row_of
+        }
+    return assemble_result_frame(
+        setup.drugs,
+        drug_codes,
+        setup.registry.names,
+        country_codes,
+        setup.month_map,
+        prices[drug_codes, country_codes],
+        volumes_cube[drug_codes, country_codes],
+        rationale
+    )
+
+
+def cube_from_frame(setup, result_df):
+    # Rebuilds the price cube and non carry-forward rationales of a previous
+    # result. Raises ValueError when it was produced from other inputs.
+    prices = np.full(setup.initial.shape, np.nan)
+    d = result_df["Drug"].astype(object).map(setup.drug_index)
+    c = result_df["Country"].astype(object).map({name: setup.registry.resolve(name) for name in result_df["Country"].unique()})
+    m = (result_df["Year"].astype(np.int64) - setup.start_year) * 12 + result_df["Month"].astype(np.int64) - 1
+    if d.isna().any() or c.isna().any() or not m.between(0, prices.shape[2] - 1).all():
+        raise ValueError("Baseline result covers drugs, countries or months outside this simulation")
+    d, c, m = d.to_numpy(np.int64), c.to_numpy(np.int64), m.to_numpy(np.int64)
+    prices[d, c, m] = result_df["Price"].to_numpy(float)
+    if not np.array_equal(prices[:, :, 0], setup.initial[:, :, 0], equal_nan=True):
+        raise ValueError("Baseline result was simulated from different initial prices")
+
+    rationale_map = None
+    if "Rationale" in result_df:
+        rationale_map = {}
+        rationale = result_df["Rationale"].to_numpy()
+        for i in np.flatnonzero(rationale != "Carry-forward"):
+            rationale_map[(d[i], c[i], m[i])] = rationale[i]
+    return prices, rationale_map
+
+
+def _finish(setup, initial_prices, volumes, prices, rationale_map, run_log, stats, change_points, converged=None):
+    # Assembles the result frame, completes `stats` and fills change_points
+    # for one engine run. attrs["converged_at"] is the (year, month) from
+    # which prices stay fixed, None when the run did not settle or was not
+    # checked (incremental runs).
+    if change_points is not None:
+        priced = ~np.isnan(setup.initial[:, :, 0])
+        for d, c in zip(*np.nonzero(priced)):
+            change_points[(setup.drugs[d], setup.registry.names[c])] = series_from_array(prices[d, c])
+    with timed(stats, "assembly"):
+        result = assemble_frame(setup, initial_prices, volume_cube(setup, volumes), prices, rationale_map)
+    result.attrs["converged_at"] = None if converged is None else setup.month_map[converged]
+    if stats is not None:
+        stats.engine = "numpy"
+        stats.count_changes(run_log)
+        stats.output_rows += len(result)
+    return result
+
+
+def new_event_log(setup, event_log):
+    # The caller's EventLog, or a new one, set up for this horizon
+    event_log = EventLog() if event_log is None else event_log
+    event_log.month_map = setup.month_map
+    return event_log
+
+
+def run_irp_simulation_vectorized(
+    initial_prices,
+    volumes,
+    irp_policies,
+    interventions=None,
+    years=10,
+    start_year=2025,
+    start_month=1,
+    rationale=True,
+    event_log=None,
+    stats=None,
+    change_points=None
+):
+    with timed(stats, "setup"):
+        setup = prepare_simulation(initial_prices, irp_policies, interventions, years, start_year)
+        prices = setup.initial.copy()
+    run_log = EventLog()
+    converged = run_months(
+        setup, prices, run_log, list(range(len(setup.drugs))), setup.interventions_by_month, stats=stats
+    )
+    with timed(stats, "event_log"):
+        run_log.relabel(setup.drugs, setup.registry.names)
+        event_log = new_event_log(setup, event_log)
+        event_log.extend(run_log)
+    rationale_map = None
+    if rationale:
+        with timed(stats, "rationale"):
+            rationale_map = rationale_texts(setup, prices, event_log)
+    return _finish(setup, initial_prices, volumes, prices, rationale_map, run_log, stats, change_points, converged)
+
+
+def run_irp_simulation_incremental(
+    baseline_df,
+    initial_prices,
+    volumes,
+    irp_policies,
+    interventions=None,
+    years=10,
+    start_year=2025,
+    start_month=1,
+    rationale=True,
+    event_log=None,
+    baseline_events=None,
+    stats=None,
+    change_points=None
+):
+    # Re-simulates a scenario on top of a baseline produced from the same
+    # prices, volumes and policies. Only drugs with interventions and the
+    # countries that reference an intervened country, directly or through
+    # other baskets, are re-run, and only from the first intervention month.
+    # Rationales of copied cells come from baseline_events, the baseline's
+    # EventLog, or else from the baseline frame's Rationale column.
+    with timed(stats, "setup"):
+        setup = prepare_simulation(initial_prices, irp_policies, interventions, years, start_year)
+    with timed(stats, "baseline"):
+        prices, frame_rationale = cube_from_frame(setup, baseline_df)
+    if rationale and baseline_events is None and frame_rationale is None:
+        raise ValueError("Rationale for an incremental run needs baseline_events or a baseline Rationale column")
+
+    event_log = new_event_log(setup, event_log)
+    first_month = min(setup.interventions_by_month, default=len(setup.month_map))
+    scenario_events = [pair for due in setup.interventions_by_month.values() for pair in due]
+    drug_rows = sorted({d for d, _ in scenario_events})
+    affected = dependent_countries(setup.schedule, {setup.registry[e.country] for _, e in scenario_events})
+
+    def rerun(d, c, m):
+        return d in drug_rows and c in affected and m >= first_month
+
+    if baseline_events is not None:
+        with timed(stats, "baseline"):
+            event_log.extend(baseline_events, lambda i: not rerun(
+                setup.drug_index[baseline_events.drug[i]],
+                setup.registry[baseline_events.country[i]],
+                baseline_events.month[i]
+            ))
+
+    run_log = EventLog()
+    if scenario_events:
+        row_of = {d: row for row, d in enumerate(drug_rows)}
+        interventions_by_month = {
+            m: [(row_of[d], e) for d, e in due] for m, due in setup.interventions_by_month.items()
+        }
+        sub_prices = prices[drug_rows]
+        run_months(setup, sub_prices, run_log, drug_rows, interventions_by_month, first_month, affected, stats)
+        prices[drug_rows] = sub_prices
+    with timed(stats, "event_log"):
+        run_log.relabel(setup.drugs, setup.registry.names)
+        event_log.extend(run_log)
+
+    rationale_map = None
+    if rationale:
+        with timed(stats, "rationale"):
+            if baseline_events is not None:
+                rationale_map = rationale_texts(setup, prices, event_log)
+            else:
+                rationale_map = {k: v for k, v in frame_rationale.items() if not rerun(*k)}
+                rationale_map.update(rationale_texts(setup, prices, run_log))
+    return _finish(setup, initial_prices, volumes, prices, rationale_map, run_log, stats, change_points)
@@ -0,0 +1,93 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Bytes of price rows one chunk of work may hold
+CHUNK_BYTES = 256 * 1024 * 1024
+
+# State of the pool that started this worker process; unused in the
+# parent, where functions get their pool's state directly
+_state = {}
+
+
+def _init_worker(state):
+    _state.update(state)
+
+
+def _call_in_worker(function, chunk):
+    return function(_state, chunk)
+
+
+def chunked(items, limit, size=len):
+    # Groups items, in order, into lists whose sizes add up to at most
+    # `limit`; an item larger than the limit gets a list of its own.
+    chunk, total = [], 0
+    for item in items:
+        item_size = size(item)
+        if chunk and total + item_size > limit:
+            yield chunk
+            chunk, total = [], 0
+        chunk.append(item)
+        total += item_size
+    if chunk:
+        yield chunk
+
+
+def rows_per_chunk(total_rows, row_bytes, workers, chunk_bytes=CHUNK_BYTES):
+    # Rows per chunk: enough to give every worker a share, few enough to
+    # stay within chunk_bytes
+    return max(1, min(chunk_bytes // max(row_bytes, 1), -(-total_rows // max(workers, 1))))
+
+
+class WorkerPool:
+    # Runs function(state, chunk) for a module-level function over chunks of
+    # work, in-process or across worker processes. `state` (setup, arrays...)
+    # reaches each worker once at start-up rather than with every chunk; the
+    # in-process path passes it straight through and keeps no copy. Work with
+    # fewer than min_items items stays in-process: for small jobs pool
+    # start-up costs more than it saves. The process pool is started on first
+    # use and kept until close().
+
+    def __init__(self, state=None, processes=None, min_items=1):
+        self.state = state or {}
+        self.workers = processes or os.cpu_count() or 1
+        self.min_items = min_items
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def parallel(self, items):
+        return self.workers > 1 and items >= self.min_items
+
+    def map(self, function, chunks, items):
+        # Results of function(chunk) in chunk order
+        chunks = list(chunks)
+        if not self.parallel(items) or len(chunks) < 2:
+            return [function(self.state, chunk) for chunk in chunks]
+        return list(self._executor().map(_call_in_worker, [function] * len(chunks), chunks))
+
+    def completed(self, function, chunks, items):
+        # Yields function(chunk) results as they finish
+        chunks = list(chunks)
+        if not self.parallel(items) or len(chunks) < 2:
+            for chunk in chunks:
+                yield function(self.state, chunk)
+            return
+        executor = self._executor()
+        for done in as_completed([executor.submit(_call_in_worker, function, chunk) for chunk in chunks]):
+            yield done.result()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _executor(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker, initargs=(self.state,)
+            )
+        return self._pool